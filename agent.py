@@ -1,265 +1,543 @@
-from langchain_ollama import ChatOllama
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain_core.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
-from tools.langchain_tools import create_tools
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain.memory import ConversationBufferWindowMemory
 from dotenv import load_dotenv
+from functools import lru_cache
+import asyncio
+import glob
 import os
+import hashlib
+import re
+import threading
+import time
+import uuid
 from datetime import datetime
-import io
-import sys
 
 load_dotenv()
 
-class BugAgent:
+_TEMPLATE = """You are a helpful bug classification and package analysis assistant for GitHub issues.
+
+AVAILABLE TOOLS:
+{tools}
+
+Tool names: {tool_names}
+
+WHICH TOOL (one row per request type):
+| User says | Tool | Done when the Observation shows |
+| "collect N bugs from owner/repo" | collect_bugs | "Data collected successfully" |
+| "classify N bugs from owner/repo" | classify_bugs | "Results saved to: data/results_" |
+| "classify AND analyze ..." / "full workflow" | classify_and_analyze | "Analysis complete!" |
+| "classify data/collected_*.jsonl" | classify_from_file | "Results saved to: data/results_" |
+| "merge <collected>,<results>" | merge_classifications | "Output saved to:" |
+| "analyze the dataset" / a .jsonl path | analyze_classifications | "Analysis complete!" |
+| trend / evolution / history of ONE package | track_package_evolution | a version-by-version table |
+| health / status / "how is X doing" for ONE package | check_package_health | "HEALTH DASHBOARD" |
+| "list/show repos for <owner>" | list_repositories | a numbered repo list |
+
+RULES:
+1. One Action per Thought, then WAIT for its Observation.
+2. Once the Observation shows the "done" marker, give the Final Answer. Never repeat a call with the same input.
+3. A package name means package tools; a file path or "dataset" means analyze_classifications.
+
+FORMAT:
+Thought: [what I need to do]
+Action: [tool name]
+Action Input: [tool input]
+... after the Observation:
+Thought: [what it tells me]
+Final Answer: [answer for the user]
+
+EXAMPLE:
+User: "Can you do a trend check for axios?"
+Thought: User wants historical trends for the axios package
+Action: track_package_evolution
+Action Input: axios
+Observation: [version-by-version evolution table]
+Thought: Evolution analysis complete
+Final Answer: Here's the bug evolution for axios across all versions...
+
+Previous conversation:
+{chat_history}
+
+Current request:
+{input}
+
+{agent_scratchpad}"""
+
+_PROMPT = PromptTemplate.from_template(_TEMPLATE)
+
+
+@lru_cache(maxsize=None)
+def _react_prompt():
+    """Render the tool block into the ReAct prompt once per process"""
+    from langchain_core.tools import render_text_description
+    from tools.langchain_tools import create_tools
+    
+    # Everything before {chat_history} is then fixed text, so Ollama can reuse
+    # its KV cache for it across turns and sessions
+    tools = create_tools()
+    return _PROMPT.partial(
+        tools=render_text_description(tools),
+        tool_names=", ".join(tool.name for tool in tools)
+    )
+
+# Tool-calling prompt: tool schemas are sent natively, so only routing rules remain
+_TOOL_CALLING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful bug classification and package analysis assistant for GitHub issues.
+
+Pick the one tool that matches the request:
+- "collect" → collect_bugs, "classify" → classify_bugs
+- classify AND analyze a repo → classify_and_analyze
+- previously collected file → classify_from_file, then merge_classifications
+- analyze a dataset or file path → analyze_classifications
+- version history of ONE package → track_package_evolution
+- current status of ONE package → check_package_health
+- browse a user's or org's repos → list_repositories
+
+When you need multiple independent pieces of information (e.g. health checks for several
+packages), call all the relevant tools in a single response.
+Never call a tool twice with the same input. Once a tool succeeds, answer from its output."""),
+    MessagesPlaceholder("chat_history"),
+    ("human", "{input}"),
+    MessagesPlaceholder("agent_scratchpad"),
+])
+
+# Iteration budget per request type, checked in order. Multi-step workflows get
+# enough room to finish instead of giving up mid-pipeline; everything else is a
+# single tool call plus the final answer.
+_ITERATION_BUDGETS = [
+    (re.compile(r"classif\w*.*\b(merge|analy[sz])|full workflow", re.IGNORECASE), 5),
+    (re.compile(r"\bmerge\b", re.IGNORECASE), 3),
+]
+_DEFAULT_MAX_ITERATIONS = 2
+
+# Fixed observation for a malformed step, instead of echoing the parser error back;
+# the ReAct agent is told its text format, the tool-calling agent is not
+_PARSING_ERROR_HINT = (
+    "Invalid format. Reply with 'Thought: ...' followed by either "
+    "'Action: <tool name>' and 'Action Input: <input>', or 'Final Answer: <answer>'."
+)
+_TOOL_CALLING_ERROR_HINT = "Invalid response. Either call one of the tools or answer the user directly."
+
+# Commands simple enough to run straight through a tool without an LLM turn. The
+# whole message has to be the command; anything else goes to the agent.
+#   "list repos vuejs", "show me the repositories for facebook"
+_LIST_REPOS_PATTERN = re.compile(
+    r"^\s*(?:list\s+repo(?:s|sitories)\s+(?!(?:for|from|of|by|in|with)\s*[.!?]?\s*$)"
+    r"|(?:show|list)\s+(?:\w+\s+){0,3}?repo(?:s|sitories)\s+(?:for|from|of|by)\s+)"
+    r"@?(\w[\w-]*)\s*[.!?]?\s*$",
+    re.IGNORECASE
+)
+#   "merge", "merge the latest results"
+_MERGE_PATTERN = re.compile(
+    r"^\s*merge(?:\s+(?:the\s+)?(?:latest\s+|last\s+|newest\s+)?(?:classification\s+)?results)?\s*[.!]?\s*$",
+    re.IGNORECASE
+)
+
+# Package health/trend questions are answered from a static dataset, so a
+# repeat of the same question within the TTL reuses the earlier answer. Only
+# questions that name the package or repo are cached ("health of axios",
+# "trend for vuejs/core"); anything that collects, classifies or merges is not.
+_CACHEABLE_PATTERN = re.compile(
+    r"\b(?:health|trends?|evolution|status)\s+(?:check\s+)?(?:of|for|on)\s+"
+    r"(?!(?:the|this|that|it|my|our|your|these|those)\b)(@?[\w.-]+(?:/[\w.-]+)?)",
+    re.IGNORECASE
+)
+_UNCACHEABLE_PATTERN = re.compile(r"classif|collect|merge", re.IGNORECASE)
+_ANSWER_TTL = 3600
+
+
+def _answer_key(message):
+    """Return the answer-cache key for a cacheable message, or None"""
+    if not _CACHEABLE_PATTERN.search(message) or _UNCACHEABLE_PATTERN.search(message):
+        return None
+    return hashlib.sha1(" ".join(message.lower().split()).encode("utf-8")).hexdigest()
+
+# Picking a tool and writing a short answer does not need a large model, so a
+# 4-bit 7B is the default (about half the memory traffic per token). Set
+# BUG_AGENT_MODEL to use another model, or high_quality=True for the 30B.
+# high_quality is qwen3:30b, the model the agent ran on before the 7B default;
+# gpt-oss:20b is the classifier's model (tools/classifier.py), not the agent's.
+_DEFAULT_MODEL = "qwen2.5:7b-instruct-q4_K_M"
+_HIGH_QUALITY_MODEL = "qwen3:30b"
+
+
+_RULE = '=' * 80
+
+
+class SessionLogHandler(BaseCallbackHandler):
+    """Stream the agent's thinking to the console and collect it for the session log"""
+    
     def __init__(self):
+        self.lines = []
+        self.closed = False
+        # Parallel tool calls report back from worker threads
+        self._lock = threading.Lock()
+    
+    def _emit(self, text, echo=True):
+        with self._lock:
+            if self.closed:
+                return
+            if echo:
+                print(text)
+            self.lines.append(text + "\n")
+    
+    def close(self):
+        """Drop the buffer and ignore callbacks still arriving from an abandoned turn"""
+        with self._lock:
+            self.closed = True
+            self.lines = []
+    
+    def drain(self):
+        """Return everything collected this turn and start a new buffer"""
+        with self._lock:
+            text = "".join(self.lines)
+            self.lines = []
+        return text
+    
+    def on_llm_new_token(self, token, **kwargs):
+        # Tokens reach the console as Ollama generates them; the log gets the
+        # assembled step from on_agent_action / on_agent_finish instead
+        if not self.closed:
+            print(token, end="", flush=True)
+    
+    def on_llm_end(self, response, **kwargs):
+        if not self.closed:
+            print()
+    
+    def on_agent_action(self, action, **kwargs):
+        self._emit(action.log, echo=False)
+    
+    def on_tool_end(self, output, **kwargs):
+        self._emit(f"Observation: {output}")
+    
+    def on_agent_finish(self, finish, **kwargs):
+        self._emit(finish.log, echo=False)
+
+
+class BugAgentFactory:
+    """Builds the expensive pieces (LLM client, tools, prompt, agent) once so sessions can share them"""
+    
+    def __init__(self, tool_calling=False, warm_up=True, high_quality=False):
+        # Heavy imports live here so importing this module stays cheap
+        from langchain_ollama import ChatOllama
+        from langchain.agents import create_react_agent, create_tool_calling_agent
+        from tools.langchain_tools import create_tools
+        
+        self.tool_calling = tool_calling
+        
         self.llm = ChatOllama(
-            model="qwen3:30b",
+            model=_HIGH_QUALITY_MODEL if high_quality else os.getenv("BUG_AGENT_MODEL", _DEFAULT_MODEL),
             base_url="http://localhost:11434",
             temperature=0.3,
-            num_predict=4096
+            # A ReAct step is a short Thought/Action block; qwen3 also thinks before
+            # answering, so the large model gets more room
+            num_predict=2048 if high_quality else 512,
+            # Keep weights and prompt KV cache loaded between turns (a negative duration such as "-1m" keeps them forever)
+            keep_alive=os.getenv("BUG_AGENT_KEEP_ALIVE", "30m")
         )
         
         self.tools = create_tools()
         
-        template = """You are a helpful bug classification and package analysis assistant for GitHub issues.
-
-        AVAILABLE TOOLS:
-        {tools}
-
-        Tool names: {tool_names}
-
-        ═══════════════════════════════════════════════════════════════════
-        TOOL DESCRIPTIONS
-        ═══════════════════════════════════════════════════════════════════
-
-        BUG COLLECTION & CLASSIFICATION:
-        1. list_repositories: Browse GitHub repos for a user/org
-        2. collect_bugs: Fetch issues from GitHub (NO classification)
-        3. classify_bugs: Fetch issues AND classify them
-        4. classify_from_file: Classify previously collected issues
-        5. merge_classifications: Combine collected + classified data
-        6. analyze_classifications: Analyze ENTIRE dataset (all packages)
-
-        PACKAGE ANALYSIS (for specific packages):
-        7. track_package_evolution: Show version-by-version bug trends for ONE package
-        8. check_package_health: Show recent health status for ONE package
-
-        ═══════════════════════════════════════════════════════════════════
-        WORKFLOW PATTERNS
-        ═══════════════════════════════════════════════════════════════════
-
-        PATTERN 1: Collect Only
-        User: "collect 5 bugs from react"
-        → Action: collect_bugs → Done
-
-        PATTERN 2: Classify (new collection)
-        User: "classify 5 bugs from react"
-        → Action: classify_bugs → Done
-
-        PATTERN 3: Full Dataset Analysis
-        User: "analyze the entire dataset"
-        → Action: analyze_classifications → Done
-
-        PATTERN 4: Package Evolution (historical trends)
-        User: "trend check for axios" OR "track axios evolution"
-        → Action: track_package_evolution → Done
-
-        PATTERN 5: Package Health (recent status)
-        User: "health check for axios" OR "how is axios doing"
-        → Action: check_package_health → Done
-
-        ═══════════════════════════════════════════════════════════════════
-        CRITICAL RULES
-        ═══════════════════════════════════════════════════════════════════
-
-        RULE 1: DISTINGUISH DATASET vs PACKAGE ANALYSIS
-        - "analyze dataset" / "analyze all bugs" → analyze_classifications (ALL packages)
-        - "trend for axios" / "track axios" → track_package_evolution (ONE package)
-        - "health of webpack" → check_package_health (ONE package)
-
-        RULE 2: ONE TOOL CALL PER THOUGHT
-        After calling a tool, WAIT for the Observation before deciding next action.
-
-        RULE 3: NO REPEATED CALLS
-        If a tool returns a success message, it worked.
-        DO NOT call it again with the same input.
-
-        RULE 4: RESPECT USER INTENT
-        - If user mentions a SPECIFIC PACKAGE NAME → use package tools (track/health)
-        - If user says "analyze dataset" or mentions FILE PATH → use analyze_classifications
-        - If user says "collect" → collect_bugs only
-        - If user says "classify" → classify_bugs only
-
-        ═══════════════════════════════════════════════════════════════════
-        TRIGGER PHRASES FOR PACKAGE ANALYSIS
-        ═══════════════════════════════════════════════════════════════════
-
-        Use track_package_evolution when user says:
-        - "trend check for [package]"
-        - "track [package] evolution"
-        - "show [package] bug history"
-        - "how did [package] change over time"
-        - "[package] version trends"
-
-        Use check_package_health when user says:
-        - "health check for [package]"
-        - "current status of [package]"
-        - "how is [package] doing"
-        - "recent trends for [package]"
-        - "[package] health dashboard"
-
-        Use analyze_classifications when user says:
-        - "analyze the dataset"
-        - "analyze data/issues_with_classifications.jsonl"
-        - "show overall statistics"
-        - "analyze all bugs"
-        - NO specific package name mentioned
-
-        ═══════════════════════════════════════════════════════════════════
-        SUCCESS INDICATORS
-        ═══════════════════════════════════════════════════════════════════
-
-        After calling a tool, check the Observation for these success messages:
-
-        - collect_bugs: "Data collected successfully"
-        - classify_bugs: "Results saved to: data/results_"
-        - merge_classifications: "Output saved to: issues_with_classifications.jsonl"
-        - analyze_classifications: "Analysis complete!"
-        - track_package_evolution: Shows version-by-version table
-        - check_package_health: Shows "HEALTH DASHBOARD"
-
-        If you see the SUCCESS indicator, that tool is DONE.
-
-        ═══════════════════════════════════════════════════════════════════
-        RESPONSE FORMAT
-        ═══════════════════════════════════════════════════════════════════
-
-        Always use this exact format:
-
-        Thought: [What I need to do]
-        Action: [tool name]
-        Action Input: [tool input]
-
-        [WAIT FOR OBSERVATION]
-
-        Thought: [What the observation tells me]
-        Action: [next tool if needed] OR Final Answer: [if done]
-
-        ═══════════════════════════════════════════════════════════════════
-        EXAMPLES
-        ═══════════════════════════════════════════════════════════════════
-
-        Example 1: Trend check for specific package
-        User: "Can you do a trend check for axios?"
-        Thought: User wants historical trends for axios package specifically
-        Action: track_package_evolution
-        Action Input: axios
-        Observation: [version-by-version evolution table]
-        Thought: Evolution analysis complete
-        Final Answer: Here's the bug evolution for axios across all versions...
-
-        Example 2: Health check for specific package
-        User: "Health check for laravel-mix over 120 months"
-        Thought: User wants recent health status for laravel-mix
-        Action: check_package_health
-        Action Input: laravel-mix,120
-        Observation: [HEALTH DASHBOARD output]
-        Thought: Health analysis complete
-        Final Answer: Here's the health status for laravel-mix...
-
-        Example 3: Analyze entire dataset
-        User: "Analyze data/issues_with_classifications_21k.jsonl"
-        Thought: User wants to analyze the entire dataset, not a specific package
-        Action: analyze_classifications
-        Action Input: data/issues_with_classifications_21k.jsonl
-        Observation: Analysis complete! Generated figures/...
-        Thought: Dataset analysis complete
-        Final Answer: Analysis complete for all 401 packages...
-
-        ═══════════════════════════════════════════════════════════════════
-
-        Previous conversation:
-        {chat_history}
-
-        Current request:
-        {input}
-
-        {agent_scratchpad}"""
-
-        prompt = PromptTemplate.from_template(template)
+        if tool_calling:
+            # Native function calling: structured tool calls, no ReAct text to parse
+            self.prompt = _TOOL_CALLING_PROMPT
+            self.agent = create_tool_calling_agent(
+                llm=self.llm,
+                tools=self.tools,
+                prompt=self.prompt
+            )
+        else:
+            self.prompt = _react_prompt()
+            self.agent = create_react_agent(
+                llm=self.llm,
+                tools=self.tools,
+                prompt=self.prompt
+            )
         
-        self.memory = ConversationBufferMemory(
+        if warm_up:
+            self._warm_up()
+    
+    def _warm_up(self):
+        """Load the model and prefill the static prompt prefix before the first real turn"""
+        print("Warming up model...")
+        try:
+            empty = [] if self.tool_calling else ""
+            static_prompt = self.prompt.invoke({"chat_history": empty, "input": "", "agent_scratchpad": empty})
+            self.llm.invoke(static_prompt, options={"num_predict": 1})
+        except Exception as e:
+            print(f"Warm-up skipped: {e}")
+    
+    def new_session(self, session_id=None):
+        """Start a conversation with its own memory and log on the shared agent"""
+        return BugSession(self, session_id)
+
+
+class BugSession:
+    """One conversation: memory, executors and session log on top of a shared BugAgentFactory"""
+    
+    def __init__(self, factory, session_id=None):
+        self.factory = factory
+        self.tool_calling = factory.tool_calling
+        
+        # Only the last few exchanges go into {chat_history} so prompt length stays bounded
+        self.memory = ConversationBufferWindowMemory(
             memory_key="chat_history",
-            return_messages=False
+            k=4,
+            return_messages=factory.tool_calling
         )
         
-        agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=prompt
-        )
+        # Recent answers to read-only package questions, for this conversation only
+        self._answer_cache = {}
         
-        self.agent_executor = AgentExecutor(
-            agent=agent,
-            tools=self.tools,
-            memory=self.memory,
-            verbose=True,
-            handle_parsing_errors=True,
-            max_iterations=2,  # Reduced from 7 to prevent long loops
-            return_intermediate_steps=True
-        )
-    
-    def chat(self, message):
-        """Handle user message and log session"""
+        # One executor per iteration budget, built on first use
+        self._executors = {}
+        self.agent_executor = self._executor(_DEFAULT_MAX_ITERATIONS)
+        
+        # One handle for the whole session, flushed once at the end of each turn
         os.makedirs('logs', exist_ok=True)
+        if session_id is None:
+            # The uuid suffix keeps sessions started in the same second apart
+            session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.session_log = f"logs/agent_session_{session_id}.log"
+        self._log_fh = open(self.session_log, 'a', encoding='utf-8', buffering=8192)
+        self._log_handler = SessionLogHandler()
+    
+    def cached_answer(self, message):
+        """Return a recent answer to the same read-only question, or None"""
+        key = _answer_key(message)
+        entry = self._answer_cache.get(key) if key else None
+        if entry and time.monotonic() - entry[0] < _ANSWER_TTL:
+            return entry[1]
+        return None
+    
+    def remember_answer(self, message, output):
+        key = _answer_key(message)
+        if key and output and not output.startswith("Agent stopped"):
+            self._answer_cache[key] = (time.monotonic(), output)
+    
+    def clear_answer_cache(self):
+        self._answer_cache.clear()
+    
+    def _executor(self, max_iterations):
+        """Return the cached AgentExecutor for an iteration budget"""
+        if max_iterations not in self._executors:
+            # LangChain's async loop already runs the tool calls of one step together
+            from langchain.agents import AgentExecutor
+            
+            self._executors[max_iterations] = AgentExecutor(
+                agent=self.factory.agent,
+                tools=self.factory.tools,
+                memory=self.memory,
+                verbose=False,  # SessionLogHandler streams the thinking instead
+                handle_parsing_errors=_TOOL_CALLING_ERROR_HINT if self.tool_calling else _PARSING_ERROR_HINT,
+                max_iterations=max_iterations,
+                return_intermediate_steps=False  # Steps are logged by SessionLogHandler as they happen
+            )
+        return self._executors[max_iterations]
+    
+    def _executor_for(self, message):
+        """Pick an executor whose iteration budget fits the request"""
+        for pattern, max_iterations in _ITERATION_BUDGETS:
+            if pattern.search(message):
+                return self._executor(max_iterations)
+        return self.agent_executor
+    
+    def _tool(self, name):
+        return next(tool for tool in self.factory.tools if tool.name == name)
+    
+    def _route_locally(self, message):
+        """Answer from the cache or run a deterministic command directly; None means use the agent"""
+        output = self.cached_answer(message)
+        if output is None:
+            output = self._run_command(message)
         
-        if not hasattr(self, 'session_log'):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.session_log = f"logs/agent_session_{timestamp}.log"
+        if output is not None:
+            self._log_handler._emit(f"Routed without the LLM:\n{output}")
+            self.memory.save_context({"input": message}, {"output": output})
+        return output
+    
+    def _run_command(self, message):
+        """Run 'list repos' and 'merge' commands through their tools; None for anything else"""
+        match = _LIST_REPOS_PATTERN.match(message)
+        if match:
+            return self._tool("list_repositories").run(match.group(1))
         
+        if _MERGE_PATTERN.match(message):
+            # "merge the results" means the newest classification run
+            results = glob.glob("data/results_*.jsonl")
+            collected = glob.glob("data/collected_*.jsonl")
+            if not results or not collected:
+                return None
+            results_file = max(results, key=os.path.getmtime)
+            collected_file = results_file.replace("results_", "collected_", 1)
+            if not os.path.exists(collected_file):
+                collected_file = max(collected, key=os.path.getmtime)
+            return self._tool("merge_classifications").run(f"{collected_file},{results_file}")
+        
+        return None
+    
+    def close(self):
+        """Close the session log"""
+        if not self._log_fh.closed:
+            self._log_fh.close()
+    
+    def __del__(self):
+        if hasattr(self, '_log_fh'):
+            self.close()
+    
+    def chat(self, message):
+        """Handle user message and log session"""
         try:
-            # Capture agent thinking
-            old_stdout = sys.stdout
-            sys.stdout = captured_output = io.StringIO()
+            self._log_user_message(message)
             
-            # Log user input
-            with open(self.session_log, 'a', encoding='utf-8') as f:
-                f.write(f"\n{'='*80}\n")
-                f.write(f"User: {message}\n")
-                f.write(f"Timestamp: {datetime.now().isoformat()}\n")
-                f.write(f"{'='*80}\n\n")
+            routed = self._route_locally(message)
+            if routed is not None:
+                return self._log_response({"output": routed})
             
-            # Run agent
-            response = self.agent_executor.invoke({"input": message})
+            # Run agent, streaming its thinking to the console and session log
+            response = self._executor_for(message).invoke(
+                {"input": message},
+                config={"callbacks": [self._log_handler]}
+            )
+            self.remember_answer(message, response.get("output"))
             
-            # Restore stdout
-            sys.stdout = old_stdout
+            return self._log_response(response)
             
-            # Get thinking process
-            agent_thinking = captured_output.getvalue()
-            
-            # Print to console
-            print(agent_thinking)
+        except Exception as e:
+            return self._log_error(e)
+    
+    async def achat(self, message):
+        """Async version of chat, so tool I/O does not block the caller's event loop"""
+        try:
+            self._log_user_message(message)
             
-            # Log everything
-            with open(self.session_log, 'a', encoding='utf-8') as f:
-                f.write("Agent Thinking:\n")
-                f.write(agent_thinking)
-                f.write(f"\n\nFinal Response:\n")
-                f.write(f"{response.get('output', 'No response')}\n")
-                f.write(f"\n{'='*80}\n")
+            routed = await asyncio.to_thread(self._route_locally, message)
+            if routed is not None:
+                return self._log_response({"output": routed})
             
-            print(f"\nSession logged to: {self.session_log}")
+            # Run agent; sync tools are dispatched to a worker thread by LangChain
+            response = await self._executor_for(message).ainvoke(
+                {"input": message},
+                config={"callbacks": [self._log_handler]}
+            )
+            self.remember_answer(message, response.get("output"))
             
-            return response.get("output", "I'm not sure how to respond to that.")
+            return self._log_response(response)
             
+        except asyncio.CancelledError:
+            self._abandon_turn()
+            raise
         except Exception as e:
-            sys.stdout = old_stdout
+            return self._log_error(e)
+    
+    def _abandon_turn(self):
+        """Close an interrupted turn so nothing from it reaches the next one"""
+        # Cancelling the turn cancels LangChain's pending tool tasks, but a sync
+        # tool already running in a worker thread can't be stopped; it finishes
+        # and reports to a handler that is now closed
+        self._log_error("Interrupted by user")
+        self._log_handler.close()
+        self._log_handler = SessionLogHandler()
+    
+    async def stream_chat(self, message):
+        """Yield the final answer as it is generated, plus a status line per tool call"""
+        try:
+            self._log_user_message(message)
+            
+            routed = await asyncio.to_thread(self._route_locally, message)
+            if routed is not None:
+                self._log_response({"output": routed})
+                yield routed
+                return
             
-            with open(self.session_log, 'a', encoding='utf-8') as f:
-                f.write(f"\nERROR: {str(e)}\n")
-                f.write(f"\n{'='*80}\n")
+            response = None
+            text = ""
+            sent = 0
+            async for event in self._executor_for(message).astream_events(
+                {"input": message},
+                config={"callbacks": [self._log_handler]},
+                version="v2"
+            ):
+                kind = event["event"]
+                
+                if kind == "on_chat_model_start":
+                    text, sent = "", 0
+                elif kind == "on_chat_model_stream" and self.tool_calling:
+                    # Tool calls arrive as structured chunks, so any text is the answer
+                    if event["data"]["chunk"].content:
+                        yield event["data"]["chunk"].content
+                elif kind == "on_chat_model_stream":
+                    # Only the part after "Final Answer:" is meant for the user
+                    text += event["data"]["chunk"].content
+                    marker = text.find("Final Answer:")
+                    if marker != -1:
+                        start = max(marker + len("Final Answer:"), sent)
+                        chunk = text[start:]
+                        if sent == 0:
+                            chunk = chunk.lstrip()
+                        if chunk:
+                            yield chunk
+                        sent = len(text)
+                elif kind == "on_tool_start":
+                    yield f"[calling {event['name']}...]\n"
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    response = event["data"]["output"]
             
-            print(f"Error: {e}")
-            return f"Sorry, I encountered an error: {str(e)}"
\ No newline at end of file
+            if response:
+                self.remember_answer(message, response.get("output"))
+            self._log_response(response or {})
+            
+        except Exception as e:
+            yield self._log_error(e)
+    
+    def _write_log(self, text, flush=False):
+        """Append to the session log without letting a logging failure end the turn"""
+        try:
+            self._log_fh.write(text)
+            if flush:
+                self._log_fh.flush()
+        except (OSError, ValueError) as e:
+            # OSError: disk full or similar; ValueError: log already closed
+            print(f"Warning: could not write session log {self.session_log}: {e}")
+    
+    def _log_user_message(self, message):
+        """Start a new turn in the session log"""
+        self._write_log(
+            f"\n{_RULE}\nUser: {message}\nTimestamp: {datetime.now().isoformat()}\n{_RULE}\n\n"
+            "Agent Thinking:\n"
+        )
+    
+    def _log_response(self, response):
+        """Log the agent's final answer"""
+        self._write_log(
+            f"{self._log_handler.drain()}\n\nFinal Response:\n{response.get('output', 'No response')}\n\n{_RULE}\n",
+            flush=True
+        )
+        
+        print(f"\nSession logged to: {self.session_log}")
+        
+        return response.get("output", "I'm not sure how to respond to that.")
+    
+    def _log_error(self, e):
+        """Log a failed turn and turn it into a reply for the user"""
+        self._write_log(f"{self._log_handler.drain()}\nERROR: {str(e)}\n\n{_RULE}\n", flush=True)
+        
+        print(f"Error: {e}")
+        return f"Sorry, I encountered an error: {str(e)}"
+
+
+class BugAgent(BugSession):
+    """Single-user agent that builds its own factory"""
+    
+    # Send the static prompt through the model at startup; set False to skip
+    warm_up = True
+    
+    def __init__(self, tool_calling=False, high_quality=False):
+        factory = BugAgentFactory(tool_calling=tool_calling, warm_up=self.warm_up, high_quality=high_quality)
+        super().__init__(factory)
+        
+        self.llm = factory.llm
+        self.tools = factory.tools
+        self.prompt = factory.prompt
+        self.agent = factory.agent
@@ -1,21 +1,56 @@
-from agent import BugAgent
+import asyncio
+import signal
+
+# Optional, not in requirements.txt: prompt_toolkit gives line editing and
+# history; plain input() is used without it
+try:
+    from prompt_toolkit import PromptSession
+except ImportError:
+    PromptSession = None
+
+
+def _run_turn(loop, agent, user_input):
+    """Run one agent turn; Ctrl-C cancels the turn and returns None"""
+    task = loop.create_task(agent.achat(user_input))
+    
+    # Ctrl-C cancels the task, so achat can close the turn in the log, instead
+    # of raising KeyboardInterrupt wherever the loop happens to be
+    previous = signal.signal(signal.SIGINT, lambda signum, frame: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        return None
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
 
 def main():
     print("\n" + "="*60)
     print("In-Ex Bug Classification Agent")
     print("="*60)
     print("Welcome! This agent can help collect andd classify GitHub issues as Intrinsic, Extrinsic, Not a Bug, or Unknown. ")
-    print("\nType 'exit' to quit\n")
+    print("\nType 'exit' to quit, 'clear-cache' to forget cached answers\n")
     
-    # Create agent
+    # Create agent (imported here so the banner shows before LangChain loads)
+    from agent import BugAgent
     agent = BugAgent()
     
+    read_input = PromptSession().prompt if PromptSession else input
+    
+    # One event loop for the whole session; Ctrl-C during a turn cancels just that turn
+    loop = asyncio.new_event_loop()
+    
     while True:
-        # Get user input
-        user_input = input("You: ").strip()
+        # Get user input; Ctrl-C or Ctrl-D at the prompt exits
+        try:
+            user_input = read_input("You: ").strip()
+        except (KeyboardInterrupt, EOFError):
+            user_input = 'exit'
         
         # Check for exit
         if user_input.lower() in ['exit', 'quit']:
+            loop.close()
+            agent.close()
             print("\nGoodbye!\n")
             break
         
@@ -23,10 +58,18 @@ def main():
         if not user_input:
             continue
         
+        if user_input.lower() == 'clear-cache':
+            agent.clear_answer_cache()
+            print("\nAnswer cache cleared.\n")
+            continue
+        
         # Get response from agent
         try:
-            response = agent.chat(user_input)
-            print(f"\nAgent: {response}\n")
+            response = _run_turn(loop, agent, user_input)
+            if response is None:
+                print("\nInterrupted.\n")
+            else:
+                print(f"\nAgent: {response}\n")
         except Exception as e:
             print(f"\nError: {e}\n")
 
@@ -2,63 +2,285 @@
 Convert your 21K classification results to the format merge_classifications expects
 """
 
+import hashlib
 import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 
-def convert_classification_format(input_file, output_file="results_21k_converted.jsonl"):
+# orjson is much faster at both ends; stdlib json is the fallback when it is missing
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# 64KB read buffers; output is gathered into ~1MB chunks per os.write
+BUFFER_SIZE = 65536
+WRITE_SIZE = 1024 * 1024
+
+# Inputs at least this large are split across worker processes
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+
+# predicted_label -> classification; anything else is UNKNOWN
+LABEL_MAP = {
+    'Not a Bug': 'NOT_A_BUG',
+    'Intrinsic': 'INTRINSIC',
+    'Extrinsic': 'EXTRINSIC',
+}
+
+# Input fields read per record, in output order, with the default for a missing key
+INPUT_FIELDS = (
+    ('timestamp', ''),
+    ('project', ''),
+    ('issue_number', 0),
+    ('title', ''),
+    ('html_url', ''),
+    ('predicted_label', None),
+    ('reasoning', ''),
+    ('probabilities', {}),
+    ('full_response', ''),
+)
+
+# Output line with a fixed key order; each field is serialized on its own and
+# formatted in, so no intermediate dict is built per record
+RECORD_TEMPLATE = (
+    b'{"timestamp":%s,"repo":%s,"number":%s,"title":%s,"url":%s,'
+    b'"state":"unknown","classification":"%s","reasoning":%s,'
+    b'"probabilities":%s,"raw_response":%s}\n'
+)
+
+def _write_all(fd, buf):
+    """os.write until the whole buffer is on disk"""
+    view = memoryview(buf)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _open_output(output_file):
+    """Raw descriptor for the output file, bypassing the Python I/O layers"""
+    return os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+def _get_fields(record):
+    """INPUT_FIELDS of a record that may be missing some of them"""
+    return tuple(record.get(key, default) for key, default in INPUT_FIELDS)
+
+def _jsonl_records(f_in, limit=None):
+    """Parse the JSONL records in f_in, stopping after limit bytes if given"""
+    remaining = limit
+    loads = _loads
+
+    for line in f_in:
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+
+        if line.strip():
+            yield loads(line)
+
+def _convert_records(records, fd, progress=True):
+    """Convert parsed records and write them to the descriptor fd"""
+    converted = 0
+    buf = bytearray()
+
+    # Local names skip the module attribute lookups inside the loop
+    dumps = _dumps
+    template = RECORD_TEMPLATE
+    label_map = {label: classification.encode('ascii') for label, classification in LABEL_MAP.items()}
+    keys = [key for key, _ in INPUT_FIELDS]
+    pick = None
+
+    for original in records:
+        # Check the schema once: if the first record has every field, read them
+        # all in one itemgetter call; otherwise fall back to .get with defaults
+        if pick is None:
+            pick = itemgetter(*keys) if all(key in original for key in keys) else _get_fields
+
+        try:
+            timestamp, project, number, title, url, label, reasoning, probabilities, raw = pick(original)
+        except KeyError:
+            timestamp, project, number, title, url, label, reasoning, probabilities, raw = _get_fields(original)
+
+        # Format the new record straight from the extracted values
+        buf += template % (
+            dumps(timestamp),
+            dumps(project),
+            dumps(number),
+            dumps(title),
+            dumps(url),
+            label_map.get(label, b'UNKNOWN'),
+            dumps(reasoning),
+            dumps(probabilities),
+            dumps(raw)
+        )
+        converted += 1
+
+        # Progress is reported at the write boundary, not checked per record
+        if len(buf) >= WRITE_SIZE:
+            _write_all(fd, buf)
+            buf.clear()
+            if progress:
+                print(f"  Converted {converted}...")
+
+    _write_all(fd, buf)
+    return converted
+
+def _convert_range(input_file, part_file, start, end):
+    """Worker: convert the lines in input_file[start:end] into part_file"""
+    with open(input_file, 'rb', buffering=BUFFER_SIZE) as f_in:
+        fd = _open_output(part_file)
+        try:
+            f_in.seek(start)
+            return _convert_records(_jsonl_records(f_in, limit=end - start), fd, progress=False)
+        finally:
+            os.close(fd)
+
+def _line_ranges(input_file, size, parts):
+    """Split the file into byte ranges of similar size that start on line boundaries"""
+    offsets = [0]
+    with open(input_file, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()
+            offset = f.tell()
+            if offsets[-1] < offset < size:
+                offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+def _convert_parallel(input_file, output_file, size, workers):
+    """Convert byte ranges in worker processes, then join the parts in order"""
+    ranges = _line_ranges(input_file, size, workers)
+    part_files = [f"{output_file}.part{i}" for i in range(len(ranges))]
+    print(f"  Using {len(ranges)} worker processes...")
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            counts = list(pool.map(
+                _convert_range,
+                [input_file] * len(ranges),
+                part_files,
+                [start for start, _ in ranges],
+                [end for _, end in ranges]
+            ))
+
+        with open(output_file, 'wb') as f_out:
+            for part_file in part_files:
+                with open(part_file, 'rb') as f_part:
+                    shutil.copyfileobj(f_part, f_out, 1024 * 1024)
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+    return sum(counts)
+
+def _file_sha256(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(WRITE_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _meta_file(output_file):
+    """Sidecar recording which input the output was converted from"""
+    return f"{output_file}.convert.meta.json"
+
+def _input_meta(input_file):
+    """What the sidecar records about the input a conversion was made from"""
+    stat = os.stat(input_file)
+    return {
+        'input': os.path.realpath(input_file),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+def _is_up_to_date(input_file, output_file):
+    """True when output_file's sidecar says it was converted from this input, unchanged since"""
+    if not os.path.exists(output_file):
+        return False
+
+    try:
+        with open(_meta_file(output_file), 'rb') as f:
+            meta = _loads(f.read())
+    except (OSError, ValueError):
+        return False
+
+    current = _input_meta(input_file)
+    if meta.get('input') != current['input']:
+        return False
+
+    if meta.get('size') == current['size'] and meta.get('mtime_ns') == current['mtime_ns']:
+        return True
+
+    # Input was touched since; it only needs converting again if its content changed
+    return meta.get('size') == current['size'] and meta.get('sha256') == _file_sha256(input_file)
+
+def convert_classification_format(input_file, output_file="results_21k_converted.jsonl", force=False):
     """
     Convert your classification format to our results format
-    
-    Input format:  {project, issue_number, predicted_label, ...}
+
+    Input format:  {project, issue_number, predicted_label, ...} per line (JSONL),
+                   or a JSON array of them
     Output format: {repo, number, classification, ...}
+
+    Skips the conversion when output_file was already converted from this same,
+    unchanged input_file (per its .convert.meta.json sidecar), unless force=True.
     """
+    if not force and _is_up_to_date(input_file, output_file):
+        print(f"✓ {output_file} is up to date with {input_file}, skipping")
+        return output_file
+
     print(f"Converting {input_file}...")
-    
-    converted = 0
-    
-    with open(input_file, 'r', encoding='utf-8') as f_in:
-        with open(output_file, 'w', encoding='utf-8') as f_out:
-            for line in f_in:
-                if not line.strip():
-                    continue
-                
-                original = json.loads(line)
-                
-                # Map predicted_label to classification
-                predicted = original.get('predicted_label', 'Unknown')
-                
-                if predicted == 'Not a Bug':
-                    classification = 'NOT_A_BUG'
-                elif predicted == 'Intrinsic':
-                    classification = 'INTRINSIC'
-                elif predicted == 'Extrinsic':
-                    classification = 'EXTRINSIC'
-                else:
-                    classification = 'UNKNOWN'
-                
-                # Create new format
-                converted_result = {
-                    'timestamp': original.get('timestamp', ''),
-                    'repo': original.get('project', ''),
-                    'number': original.get('issue_number', 0),
-                    'title': original.get('title', ''),
-                    'url': original.get('html_url', ''),
-                    'state': 'unknown',
-                    'classification': classification,
-                    'reasoning': original.get('reasoning', ''),
-                    'probabilities': original.get('probabilities', {}),
-                    'raw_response': original.get('full_response', '')
-                }
-                
-                f_out.write(json.dumps(converted_result, ensure_ascii=False) + '\n')
-                converted += 1
-                
-                if converted % 1000 == 0:
-                    print(f"  Converted {converted}...")
-    
+
+    size = os.path.getsize(input_file)
+    workers = os.cpu_count() or 1
+
+    # The old sidecar no longer describes output_file once it is replaced, and
+    # the new output is written to a temp file first, so a failed conversion
+    # never leaves a partial output that a later run takes as up to date
+    meta_file = _meta_file(output_file)
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+    tmp_file = f"{output_file}.tmp"
+
+    try:
+        # Both ends work on raw UTF-8 bytes, so nothing is decoded or encoded as text
+        with open(input_file, 'rb', buffering=BUFFER_SIZE) as f_in:
+            # A JSON array can't be split by lines; peek at the first byte to tell
+            is_array = f_in.peek(1).lstrip()[:1] == b'['
+
+            if not is_array and size >= PARALLEL_MIN_BYTES and workers > 1:
+                converted = _convert_parallel(input_file, tmp_file, size, workers)
+            else:
+                records = _loads(f_in.read()) if is_array else _jsonl_records(f_in)
+                fd = _open_output(tmp_file)
+                try:
+                    converted = _convert_records(records, fd)
+                finally:
+                    os.close(fd)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    os.replace(tmp_file, output_file)
+
+    meta = _input_meta(input_file)
+    meta['sha256'] = _file_sha256(input_file)
+    with open(meta_file, 'wb') as f:
+        f.write(_dumps(meta))
+
     print(f"✓ Converted {converted} classifications")
     print(f"✓ Saved to: {output_file}")
-    
+
     return output_file
 
 if __name__ == "__main__":
-    convert_classification_format('classified_23k_bugs.jsonl')
\ No newline at end of file
+    convert_classification_format('classified_23k_bugs.jsonl')
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_core")
+pytest.importorskip("dotenv")
+
+from agent import _LIST_REPOS_PATTERN, _MERGE_PATTERN, _answer_key
+
+
+@pytest.mark.parametrize("message, owner", [
+    ("list repos vuejs", "vuejs"),
+    ("list repositories facebook", "facebook"),
+    ("show me the repositories for facebook", "facebook"),
+    ("list repos of axios", "axios"),
+    ("show repos for sindresorhus.", "sindresorhus"),
+])
+def test_list_repos_command(message, owner):
+    match = _LIST_REPOS_PATTERN.match(message)
+    assert match and match.group(1) == owner
+
+
+@pytest.mark.parametrize("message", [
+    "show me repos with the most bugs",
+    "list the repos you analyzed",
+    "show all repos in the dataset",
+    "list repos for the org facebook",
+    "list repos for",
+    "show repos",
+])
+def test_list_repos_falls_back_to_agent(message):
+    assert _LIST_REPOS_PATTERN.match(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "merge",
+    "merge the latest results",
+    "Merge results!",
+])
+def test_merge_command(message):
+    assert _MERGE_PATTERN.match(message)
+
+
+@pytest.mark.parametrize("message", [
+    "merge data/collected_1.jsonl,data/results_1.jsonl",
+    "merge them and then analyze the output",
+    "merge is that possible?",
+    "merger details for axios",
+])
+def test_merge_falls_back_to_agent(message):
+    assert _MERGE_PATTERN.match(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "health of axios",
+    "What's the health check for vuejs/core?",
+    "show the trend for lodash",
+    "evolution of @babel/core",
+])
+def test_named_package_questions_are_cached(message):
+    assert _answer_key(message) is not None
+
+
+@pytest.mark.parametrize("message", [
+    "show me our conversation history",
+    "how is it going",
+    "what is the status of the classification",
+    "status of my repo",
+    "collect the health of axios",
+])
+def test_other_questions_are_not_cached(message):
+    assert _answer_key(message) is None
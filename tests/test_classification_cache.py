@@ -0,0 +1,23 @@
+from tools.classification_cache import ClassificationCache, prompt_key
+
+
+def test_key_covers_model_and_whole_prompt():
+    prompt = 'guide\n' + 'x' * 10000 + '\n**Bug Project:** owner/repo'
+    key = prompt_key(prompt, 'model')
+
+    assert prompt_key(prompt, 'model') == key
+    assert prompt_key(prompt, 'other-model') != key
+    # Differences past the issue text, like the repo or the guide, change the key
+    assert prompt_key(prompt.replace('owner/repo', 'owner/fork'), 'model') != key
+    assert prompt_key('new ' + prompt, 'model') != key
+
+
+def test_round_trip(tmp_path):
+    cache = ClassificationCache(str(tmp_path / 'cache.sqlite'))
+    key = prompt_key('prompt', 'model')
+    assert cache.get(key) is None
+
+    result = {'classification': 'INTRINSIC', 'reasoning': 'r',
+              'probabilities': {'INTRINSIC': 0.9}, 'raw_response': 'raw'}
+    cache.put(key, result)
+    assert cache.get(key) == result
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import convert_classifications as cc
+
+
+def _write_input(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'project': 'owner/repo', 'issue_number': i,
+                                'predicted_label': 'Intrinsic'}) + '\n')
+
+
+def _rows(path):
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def test_same_output_different_input_is_reconverted(tmp_path):
+    big = tmp_path / 'big.jsonl'
+    small = tmp_path / 'small.jsonl'
+    shared = tmp_path / 'shared.jsonl'
+    _write_input(big, 5)
+    _write_input(small, 3)
+    # big is the older file, so the output is newer than it after the first run
+    os.utime(big, (1_000_000, 1_000_000))
+
+    cc.convert_classification_format(str(small), str(shared))
+    assert _rows(shared) == 3
+
+    cc.convert_classification_format(str(big), str(shared))
+    assert _rows(shared) == 5
+
+
+def test_unchanged_input_is_skipped(tmp_path, capsys):
+    src = tmp_path / 'in.jsonl'
+    out = tmp_path / 'out.jsonl'
+    _write_input(src, 4)
+
+    cc.convert_classification_format(str(src), str(out))
+    capsys.readouterr()
+    cc.convert_classification_format(str(src), str(out))
+    assert 'up to date' in capsys.readouterr().out
+
+    # Touching the input without changing its content still skips
+    os.utime(src)
+    cc.convert_classification_format(str(src), str(out))
+    assert 'up to date' in capsys.readouterr().out
+
+
+def test_changed_input_is_reconverted(tmp_path):
+    src = tmp_path / 'in.jsonl'
+    out = tmp_path / 'out.jsonl'
+    _write_input(src, 4)
+    cc.convert_classification_format(str(src), str(out))
+
+    _write_input(src, 6)
+    cc.convert_classification_format(str(src), str(out))
+    assert _rows(out) == 6
+
+
+def test_failed_conversion_is_not_taken_as_up_to_date(tmp_path):
+    good = tmp_path / 'good.jsonl'
+    bad = tmp_path / 'bad.jsonl'
+    out = tmp_path / 'out.jsonl'
+    _write_input(good, 4)
+    _write_input(bad, 3)
+    with open(bad, 'a', encoding='utf-8') as f:
+        f.write('{not json\n')
+
+    cc.convert_classification_format(str(good), str(out))
+    with pytest.raises(ValueError):
+        cc.convert_classification_format(str(bad), str(out))
+
+    # The earlier output is untouched, and no temp file is left behind
+    assert _rows(out) == 4
+    assert not os.path.exists(f"{out}.tmp")
@@ -1,13 +1,18 @@
-import json
+import orjson
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import seaborn as sns
+from matplotlib.collections import PatchCollection, PolyCollection
 from matplotlib.patches import Rectangle
 import os
+import sys
+from functools import lru_cache, partial
 
-KNOWN_BOTS = {"stale[bot]", "vue-bot"}
+KNOWN_BOTS = frozenset({"stale[bot]", "vue-bot"})
 BUG_TYPES_ORDER = ['Intrinsic', 'Extrinsic', 'Not  a Bug', 'Unknown']
 COLOR_PALETTE = {
     'Intrinsic': '#5B9BD5',
@@ -15,58 +20,112 @@ COLOR_PALETTE = {
     'Not  a Bug': '#70AD47',
     'Unknown': '#FFC000'
 }
+# Passed to Pillow for every PNG: fast zlib level, no second optimize pass
+PNG_SAVE_OPTIONS = {'compress_level': 1, 'optimize': False}
 
 
-def _closed_by_username(row):
-    x = row.get("closed_by")
-    return x.get("username") if isinstance(x, dict) and x.get("username") else "Unknown"
+def _closed_by_usernames(df):
+    if "closed_by" not in df.columns:
+        return pd.Series("Unknown", index=df.index)
+    names = [x["username"] if isinstance(x, dict) and x.get("username") else "Unknown"
+             for x in df["closed_by"].to_numpy()]
+    return pd.Series(names, index=df.index)
 
 def _bot_closed_mask(df):
-    df_local = df
-    if "closed_by_username" not in df.columns:
-        df_local = df.copy()
-        df_local["closed_by_username"] = df_local.apply(_closed_by_username, axis=1)
-    is_closed = df_local["state"].str.lower().eq("closed")
-    return is_closed & df_local["closed_by_username"].isin(KNOWN_BOTS)
+    names = df["closed_by_username"] if "closed_by_username" in df.columns else _closed_by_usernames(df)
+    is_closed = df["is_closed"] if "is_closed" in df.columns else df["state"].str.lower().eq("closed")
+    return is_closed & names.isin(KNOWN_BOTS)
+
+def _class_groups(df, groups=None):
+    """df grouped by bug_type, reusing the GroupBy main() shares when given."""
+    return groups if groups is not None else df.groupby("bug_type", observed=True)
+
+def _mmp(g):
+    """Mean / Median / P90 of a grouped series, all on pandas' built-in group reductions."""
+    return pd.concat([g.mean().rename("Mean"), g.median().rename("Median"), g.quantile(0.9).rename("P90")], axis=1)
 
 def _fmt_pct(col):
     return col.map(lambda v: f"{v:.2f}%" if pd.notnull(v) else "")
 
-def _sec_series(series, key):
+def _num(value):
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+def _nonempty_dict_mask(series):
+    values = series.to_numpy()
+    return np.fromiter((isinstance(x, dict) and len(x) > 0 for x in values), dtype=bool, count=len(values))
 
-    vals, idx = [], []
-    for i, x in series.items():
-        if isinstance(x, dict) and isinstance(x.get(key), (int, float)):
-            vals.append(float(x[key]))
-        else:
-            vals.append(None)
-        idx.append(i)
-    return pd.Series(vals, index=idx, dtype="float")
+def _flatten_metrics(df):
+    """Pull the nested metric dicts out into flat float columns, in a single pass.
+
+    Flag columns are 1.0/0.0, and NaN where the metrics dict itself is missing.
+    """
+    n = len(df)
+    names = [
+        "time_to_close_seconds", "time_to_first_response_seconds",
+        "has_maintainer_response", "maintainer_participants", "total_participants",
+        "was_reopened", "reopen_count", "time_to_reopen_seconds",
+        "files_changed", "additions", "deletions",
+    ]
+    cols = {name: np.full(n, np.nan) for name in names}
+
+    def _column(name):
+        return df[name].to_numpy() if name in df.columns else [None] * n
+
+    rows = zip(_column("timestamp_metrics"), _column("participant_metrics"),
+               _column("reopen_metrics"), _column("closing_pr"), _column("closing_commit"))
+    for i, (tm, pm, rm, pr, commit) in enumerate(rows):
+        if isinstance(tm, dict):
+            cols["time_to_close_seconds"][i] = _num(tm.get("time_to_close_seconds"))
+            cols["time_to_first_response_seconds"][i] = _num(tm.get("time_to_first_response_seconds"))
+
+        if isinstance(pm, dict):
+            cols["has_maintainer_response"][i] = 1.0 if pm.get("has_maintainer_response") else 0.0
+            cols["maintainer_participants"][i] = _num(pm.get("maintainer_participants"))
+            cols["total_participants"][i] = _num(pm.get("total_participants"))
+
+        if isinstance(rm, dict):
+            cols["was_reopened"][i] = 1.0 if rm.get("was_reopened") else 0.0
+            cols["reopen_count"][i] = _num(rm.get("reopen_count"))
+            cols["time_to_reopen_seconds"][i] = _num(rm.get("time_to_reopen_seconds"))
+
+        # Code stats come from the closing PR, else the closing commit,
+        # and may be directly on it or under its 'stats'
+        src = pr if isinstance(pr, dict) else commit
+        if isinstance(src, dict):
+            stats = src.get("stats") if isinstance(src.get("stats"), dict) else src
+            cols["files_changed"][i] = _num(stats.get("files_changed"))
+            cols["additions"][i] = _num(stats.get("additions"))
+            cols["deletions"][i] = _num(stats.get("deletions"))
+
+    for name, values in cols.items():
+        df[name] = values
 
 def _prepare_dataframe(df):
-    """Add computed columns to dataframe for easier analysis."""
-    df = df.copy()
-    
-    df['bug_type'] = df['final_classification'].str.strip()
+    """Add computed columns to dataframe for easier analysis (in place)."""
+    # Categorical keys group as small integer codes and keep BUG_TYPES_ORDER;
+    # any unexpected classification is kept as an extra category after those
+    bug_type = df['final_classification'].str.strip()
+    extra_types = sorted(set(bug_type.dropna()) - set(BUG_TYPES_ORDER))
+    df['bug_type'] = pd.Categorical(bug_type, categories=BUG_TYPES_ORDER + extra_types)
     
     df['is_closed'] = df['state'].str.lower() == 'closed'
     
-    df['time_to_close_days'] = df['timestamp_metrics'].apply(
-        lambda x: x['time_to_close_seconds'] / 86400 if isinstance(x, dict) and 
-        isinstance(x.get('time_to_close_seconds'), (int, float)) else None
-    )
+    _flatten_metrics(df)
     
+    df['time_to_close_days'] = df['time_to_close_seconds'] / 86400
     
-    df['closed_by_username'] = df.apply(_closed_by_username, axis=1)
+    
+    df['closed_by_username'] = pd.Categorical(_closed_by_usernames(df))
     
     df['bot_closed'] = _bot_closed_mask(df)
     
-    df["closed_by_pr"] = df["closing_pr"].apply(
-        lambda x: isinstance(x, dict) and len(x) > 0 if pd.notna(x) else False
-    )
-    df["closed_by_commit"] = df["closing_commit"].apply(
-        lambda x: isinstance(x, dict) and len(x) > 0 if pd.notna(x) else False
-    )
+    df["closed_by_pr"] = _nonempty_dict_mask(df["closing_pr"])
+    df["closed_by_commit"] = _nonempty_dict_mask(df["closing_commit"])
+    
+    # Closure masks the analyzers share
+    df['human_closed'] = df['is_closed'] & ~df['bot_closed']
+    df['pr_closed'] = df['is_closed'] & df['closed_by_pr']
+    df['commit_closed'] = df['is_closed'] & df['closed_by_commit']
     
     if 'project' not in df.columns:
         if 'owner' in df.columns and 'repo' in df.columns:
@@ -75,16 +134,59 @@ def _prepare_dataframe(df):
     return df
 
 
+def _cache_path(path):
+    """Pickled prepared DataFrame kept next to the JSONL it was built from."""
+    return f"{path}.prepared.pkl"
+
+def _source_stamp(path):
+    """Size and mtime_ns of the JSONL and of this module, stored with the cache."""
+    return tuple((st.st_size, st.st_mtime_ns) for st in map(os.stat, (path, __file__)))
+
+def _read_cache(path, cache):
+    """The cached DataFrame for path, or None if it is missing, stale or unreadable."""
+    if not os.path.exists(cache):
+        return None
+    try:
+        stamp, df = pd.read_pickle(cache)
+    except Exception as e:
+        print(f"Could not read {cache} ({e}), parsing {path} instead")
+        return None
+    # Equality, not "newer than": a file moved or copied into place can carry
+    # an older mtime than the cache built from the previous contents
+    return df if stamp == _source_stamp(path) else None
+
 def load_data(path="issues.jsonl"):
-    """Load JSONL data into a pandas DataFrame."""
+    """Load JSONL data into a pandas DataFrame.
+
+    The prepared DataFrame is pickled next to the input, and re-runs read it
+    back instead of parsing the JSONL again until either the JSONL or this
+    module changes size or mtime. Unpickling runs whatever the file says, so
+    the cache is only as trustworthy as the directory it sits in; any error
+    reading it falls back to parsing the JSONL.
+    """
+    cache = _cache_path(path)
+    df = _read_cache(path, cache)
+    if df is not None:
+        print(f"Loading data from {cache}...")
+        return df
+
     print(f"Loading data from {path}...")
-    with open(path, "r", encoding="utf-8") as f:
-        data = [json.loads(line) for line in f]
-    df = pd.DataFrame(data)
-    return _prepare_dataframe(df)
+    # Taken before parsing, so a file that changes meanwhile is re-read next time
+    stamp = _source_stamp(path)
+    # Parse line by line so neither the whole file nor a split copy of it is
+    # held next to the parsed records
+    with open(path, "rb") as f:
+        data = [orjson.loads(line) for line in f if line.strip()]
+    df = _prepare_dataframe(pd.DataFrame(data))
+
+    try:
+        pd.to_pickle((stamp, df), cache)
+    except OSError as e:
+        print(f"Could not write {cache}: {e}")
+    return df
 
 
-def analyze_bot_closures(df):
+def analyze_bot_closures(df, groups=None):
     print("\n" + "="*70)
     print("SECTION 1: BOT-CLOSED ISSUES")
     print("="*70)
@@ -94,9 +196,9 @@ def analyze_bot_closures(df):
     print(f"\nBot-closed issues: {total_bot}/{total_all} ({(total_bot/total_all*100):.2f}%)")
 
     by_class = (
-        pd.DataFrame({"bot_closed": df['bot_closed'], "class": df["bug_type"]})
-        .groupby("class")["bot_closed"]
+        _class_groups(df, groups)["bot_closed"]
         .agg(count="sum", total="count")
+        .rename_axis("class")
     )
     by_class["pct"] = (by_class["count"] / by_class["total"] * 100).round(2)
     print("\nBot-closed by class (count / total, %):")
@@ -108,46 +210,43 @@ def analyze_class_distribution(df):
     print("="*70)
     
     counts = df["bug_type"].value_counts().sort_index()
+    counts = counts[counts > 0]
     pct = counts / counts.sum() * 100
     tbl = pd.DataFrame({"Count": counts, "Percent": _fmt_pct(pct)})
     print("\n" + tbl.to_string())
 
-def analyze_closed_ratio(df):
+def analyze_closed_ratio(df, groups=None):
     print("\n" + "-"*70)
     print("Closed Ratio (All Issues vs Excluding Bots)")
     print("-"*70)
     
+    groups = _class_groups(df, groups)
+    
     # Closed % for all issues
-    t_all = (df.groupby("bug_type")['is_closed']
+    t_all = (groups['is_closed']
                .mean().mul(100).round(2)
                .rename("Closed % (All)"))
 
-    is_closed_by_human = df['is_closed'] & ~df['bot_closed']
-    t_nb = (df.assign(_closed_human=is_closed_by_human)
-               .groupby("bug_type")["_closed_human"]
+    t_nb = (groups["human_closed"]
                .mean().mul(100).round(2)
                .rename("Closed % (No Bots)"))
 
-    out = pd.concat([t_all, t_nb], axis=1).sort_index()
+    out = pd.concat([t_all, t_nb], axis=1)
     out["Closed % (All)"] = _fmt_pct(out["Closed % (All)"])
     out["Closed % (No Bots)"] = _fmt_pct(out["Closed % (No Bots)"])
     print("\n" + out.to_string())
 
-def analyze_comments(df):
+def analyze_comments(df, groups=None):
     """Calculate average, median, and P90 comments per classification."""
     print("\n" + "-"*70)
     print("Comment Statistics by Class")
     print("-"*70)
     
-    result = (
-        df.groupby("bug_type")["comments_count"]
-        .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9))
-        .round(2)
-    )
+    result = _mmp(_class_groups(df, groups)["comments_count"]).round(2)
     print("\n" + result.to_string())
 
 
-def analyze_time_to_close(df):
+def analyze_time_to_close(df, groups=None):
     print("\n" + "="*70)
     print("SECTION 3: TIMING ANALYSIS")
     print("="*70)
@@ -155,18 +254,12 @@ def analyze_time_to_close(df):
     print("-"*70)
     
     # All issues
-    days_all = _sec_series(df["timestamp_metrics"], "time_to_close_seconds") / 86400.0
-    g_all = (df.assign(_days=days_all)
-               .groupby("bug_type")["_days"]
-               .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9)).round(2))
+    g_all = _mmp(_class_groups(df, groups)["time_to_close_days"]).round(2)
     g_all.columns = [f"{c} (All)" for c in g_all.columns]
 
     # No bots
-    df_nb = df.loc[~df['bot_closed']].copy()
-    days_nb = _sec_series(df_nb["timestamp_metrics"], "time_to_close_seconds") / 86400.0
-    g_nb = (df_nb.assign(_days=days_nb)
-                 .groupby("bug_type")["_days"]
-                 .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9)).round(2))
+    df_nb = df.loc[~df['bot_closed']]
+    g_nb = _mmp(df_nb.groupby("bug_type", observed=True)["time_to_close_days"]).round(2)
     g_nb.columns = [f"{c} (No Bots)" for c in g_nb.columns]
 
     out = g_all.join(g_nb, how="outer").sort_index()
@@ -177,11 +270,8 @@ def analyze_time_to_first_response(df):
     print("Time to First Response (hours)")
     print("-"*70)
     
-    hrs = _sec_series(df["timestamp_metrics"], "time_to_first_response_seconds") / 3600.0
-    result = (df.assign(_hrs=hrs)
-             .groupby("bug_type")["_hrs"]
-             .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9))
-             .round(2))
+    hrs = df["time_to_first_response_seconds"] / 3600.0
+    result = _mmp(hrs.groupby(df["bug_type"], observed=True)).round(2)
     print("\n" + result.to_string())
 
 def analyze_maintainer_involvement(df):
@@ -189,27 +279,18 @@ def analyze_maintainer_involvement(df):
     print("SECTION 4: MAINTAINER INVOLVEMENT")
     print("="*70)
     
-    rows = []
-    for _, row in df.iterrows():
-        m = row.get("participant_metrics")
-        if isinstance(m, dict):
-            rows.append({
-                "bug_type": row.get("bug_type"),
-                "has_maint": 1 if m.get("has_maintainer_response") else 0,
-                "maintainers": m.get("maintainer_participants", None),
-                "participants": m.get("total_participants", None),
-            })
-    
-    if not rows:
+    # Issues that have participant metrics at all
+    tmp = df.loc[df["has_maintainer_response"].notna()]
+    
+    if tmp.empty:
         print("\nNo maintainer data available.")
         return
 
-    tmp = pd.DataFrame(rows)
-    result = (tmp.groupby("bug_type")
+    result = (tmp.groupby("bug_type", observed=True)
              .agg(
-                 Response_Rate=("has_maint", lambda s: s.mean() * 100),
-                 Avg_Maintainers=("maintainers", "mean"),
-                 Avg_Participants=("participants", "mean"),
+                 Response_Rate=("has_maintainer_response", lambda s: s.mean() * 100),
+                 Avg_Maintainers=("maintainer_participants", "mean"),
+                 Avg_Participants=("total_participants", "mean"),
              )
              .round(2))
     result["Response_Rate"] = _fmt_pct(result["Response_Rate"])
@@ -220,27 +301,14 @@ def analyze_maintainer_ratio(df):
     print("Maintainer Participation Ratio (% of total participants)")
     print("-"*70)
     
-    rows = []
-    for _, row in df.iterrows():
-        metrics = row.get("participant_metrics")
-        if isinstance(metrics, dict):
-            total = metrics.get("total_participants")
-            maint = metrics.get("maintainer_participants")
-            if isinstance(total, (int, float)) and isinstance(maint, (int, float)) and total > 0:
-                ratio = maint / total
-                rows.append({"bug_type": row.get("bug_type"), "ratio": ratio})
-
-    if not rows:
+    total = df["total_participants"]
+    ratio = (df["maintainer_participants"] / total.where(total > 0)).dropna()
+
+    if ratio.empty:
         print("\nNo valid participant data found.")
         return
 
-    result = (
-        pd.DataFrame(rows)
-        .groupby("bug_type")["ratio"]
-        .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9))
-        .mul(100)
-        .round(2)
-    )
+    result = _mmp(ratio.groupby(df["bug_type"], observed=True)).mul(100).round(2)
     print("\n" + result.to_string())
     
 def analyze_reopens(df):
@@ -248,26 +316,18 @@ def analyze_reopens(df):
     print("SECTION 5: REOPEN STATISTICS (Excluding Bot-Closed)")
     print("="*70)
     
-    df_nb = df.loc[~df['bot_closed']].copy()
-
-    rows = []
-    for _, row in df_nb.iterrows():
-        r = row.get("reopen_metrics")
-        if isinstance(r, dict):
-            rows.append({
-                "bug_type": row.get("bug_type"),
-                "was_reopened": 1 if r.get("was_reopened") else 0,
-                "reopen_count": r.get("reopen_count", None),
-                "time_to_reopen_days": (r.get("time_to_reopen_seconds") / 86400.0
-                                        if isinstance(r.get("time_to_reopen_seconds"), (int, float)) else None),
-            })
-    
-    if not rows:
+    # Non-bot issues that have reopen metrics at all
+    tmp = df.loc[~df['bot_closed'] & df["was_reopened"].notna()]
+    
+    if tmp.empty:
         print("\nNo reopen data available.")
         return
 
-    tmp = pd.DataFrame(rows)
-    result = (tmp.groupby("bug_type")
+    tmp = tmp.assign(
+        was_reopened=tmp["was_reopened"].astype(int),
+        time_to_reopen_days=tmp["time_to_reopen_seconds"] / 86400.0,
+    )
+    result = (tmp.groupby("bug_type", observed=True)
              .agg(
                  Count=("was_reopened", "sum"),
                  Percentage=("was_reopened", lambda s: s.mean() * 100),
@@ -279,6 +339,7 @@ def analyze_reopens(df):
     print("\n" + result.to_string())
 
 
+@lru_cache(maxsize=None)
 def _categorize_label(label_name):
     name = label_name.lower()
     
@@ -320,36 +381,26 @@ def analyze_labels(df):
     print("SECTION 6: LABEL ANALYSIS")
     print("="*70)
 
-    rows = []
-    for _, row in df.iterrows():
-        issue_class = row.get("bug_type")
-        labels = row.get("labels")
+    labels = df["labels"] if "labels" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    has_labels = labels.map(lambda x: isinstance(x, list) and len(x) > 0)
 
-        if not labels or not isinstance(labels, list) or len(labels) == 0:
-            rows.append((issue_class, "No Label"))
-            continue
+    # One row per label; names repeat a lot, so each distinct one is categorized once
+    ex = df.loc[has_labels, ["bug_type"]].assign(labels=labels[has_labels]).explode("labels")
+    names = ex["labels"].map(lambda x: x.get("name") if isinstance(x, dict) else None)
+    named = names.map(lambda x: isinstance(x, str) and x != "").to_numpy()
 
-        for label in labels:
-            if isinstance(label, dict) and label.get("name"):
-                cat = _categorize_label(label["name"])
-                rows.append((issue_class, cat))
+    tmp = pd.concat([
+        pd.DataFrame({"bug_type": df.loc[~has_labels, "bug_type"], "category": "No Label"}),
+        pd.DataFrame({"bug_type": ex["bug_type"][named], "category": names[named].map(_categorize_label)}),
+    ], ignore_index=True).astype({"bug_type": object})
 
-    if not rows:
+    if tmp.empty:
         print("\nNo labels found.")
         return
 
-    tmp = pd.DataFrame(rows, columns=["bug_type", "category"])
-
-    # Raw counts
-    counts = (
-        tmp.value_counts()
-           .rename("count")
-           .reset_index()
-           .pivot(index="bug_type", columns="category", values="count")
-           .fillna(0)
-           .astype(int)
-           .sort_index()
-    )
+    # Raw counts, rows in the same class order as the other sections
+    counts = pd.crosstab(tmp["bug_type"], tmp["category"]).astype(np.int32)
+    counts = counts.reindex([t for t in df["bug_type"].cat.categories if t in counts.index])
 
     dist_all = counts.div(counts.sum(axis=1), axis=0).round(3) * 100
 
@@ -364,44 +415,19 @@ def analyze_labels(df):
     print(dist_labeled)
 
 
-def _extract_code_stats(row):
-    cls = row.get("bug_type", "Unknown")
-    src = row.get("closing_pr") if isinstance(row.get("closing_pr"), dict) else row.get("closing_commit")
-    
-    if not isinstance(src, dict):
-        return None
-    
-    # Stats may be directly on src or under src['stats']
-    stats = src.get("stats") if isinstance(src.get("stats"), dict) else src
-    
-    files = stats.get("files_changed")
-    adds = stats.get("additions")
-    dels = stats.get("deletions")
-    
-    if isinstance(files, (int, float)) or isinstance(adds, (int, float)) or isinstance(dels, (int, float)):
-        return {
-            "bug_type": cls,
-            "files_changed": files if isinstance(files, (int, float)) else None,
-            "additions": adds if isinstance(adds, (int, float)) else None,
-            "deletions": dels if isinstance(dels, (int, float)) else None
-        }
-    return None
-
 def analyze_code_changes(df):
 
     print("\n" + "="*70)
     print("SECTION 7: CODE CHANGE ANALYSIS")
     print("="*70)
 
-    rows = [_extract_code_stats(row) for _, row in df.iterrows()]
-    rows = [r for r in rows if r is not None]
+    code_cols = ["files_changed", "additions", "deletions"]
+    df_stats = df.loc[df[code_cols].notna().any(axis=1), ["bug_type"] + code_cols]
 
-    if not rows:
+    if df_stats.empty:
         print("\nNo code change data available.")
         return
 
-    df_stats = pd.DataFrame(rows)
-
     # Overall averages
     overall = df_stats.agg({"files_changed":"mean","additions":"mean","deletions":"mean"}).round(2)
     print("\nOverall Averages:")
@@ -410,10 +436,9 @@ def analyze_code_changes(df):
 
     # By classification
     by_class = (
-        df_stats.groupby("bug_type")
+        df_stats.groupby("bug_type", observed=True)
                 .agg({"files_changed":"mean","additions":"mean","deletions":"mean"})
                 .round(2)
-                .sort_index()
     )
     print("\nAverages by Classification:")
     print(by_class)
@@ -424,29 +449,17 @@ def analyze_change_effort(df):
     print("Total Lines Changed (Additions + Deletions)")
     print("-"*70)
 
-    rows = []
-    for _, row in df.iterrows():
-        stats = _extract_code_stats(row)
-        if stats:
-            adds = stats.get("additions")
-            dels = stats.get("deletions")
-            if isinstance(adds, (int, float)) and isinstance(dels, (int, float)):
-                rows.append({"bug_type": stats["bug_type"], "total_lines": adds + dels})
+    total_lines = (df["additions"] + df["deletions"]).dropna()
 
-    if not rows:
+    if total_lines.empty:
         print("\nNo line change data available.")
         return
 
-    result = (
-        pd.DataFrame(rows)
-        .groupby("bug_type")["total_lines"]
-        .agg(Mean="mean", Median="median", P90=lambda s: s.quantile(0.9))
-        .round(2)
-    )
+    result = _mmp(total_lines.groupby(df["bug_type"], observed=True)).round(2)
     print("\n" + result.to_string())
 
 
-def analyze_closure_methods(df):
+def analyze_closure_methods(df, groups=None):
     """
     Analyze how issues were closed: by PR, by commit, or manually.
     Shows breakdown by classification.
@@ -459,8 +472,8 @@ def analyze_closure_methods(df):
     total_issues = len(df)
     
     # Overall statistics
-    closed_by_pr = (df['closed_by_pr'] & total_closed).sum()
-    closed_by_commit = (df['closed_by_commit'] & total_closed).sum()
+    closed_by_pr = df['pr_closed'].sum()
+    closed_by_commit = df['commit_closed'].sum()
     closed_by_code = closed_by_pr + closed_by_commit
     
     print("\nOverall Closure Methods:")
@@ -470,26 +483,19 @@ def analyze_closure_methods(df):
     print(f"  Among closed:     {closed_by_code}/{total_closed.sum()} ({closed_by_code/total_closed.sum()*100:.2f}%)")
 
 
-    rows = []
-    for cls, g in df.groupby("bug_type"):
-        total = len(g)
-        closed = g['is_closed'].sum()
-        by_pr = (g['is_closed'] & g['closed_by_pr']).sum()
-        by_commit = (g['is_closed'] & g['closed_by_commit']).sum()
-        
-        rows.append({
-            "Classification": cls,
-            "Total": total,
-            "Closed": closed,
-            "By_PR": by_pr,
-            "By_Commit": by_commit,
-            "By_Code": by_pr + by_commit,
-            "% Code": round((by_pr + by_commit) / closed * 100, 2) if closed > 0 else 0.0,
-            "% PR": round(by_pr / closed * 100, 2) if closed > 0 else 0.0,
-            "% Commit": round(by_commit / closed * 100, 2) if closed > 0 else 0.0
-        })
-    
-    summary = pd.DataFrame(rows).set_index("Classification")
+    summary = _class_groups(df, groups).agg(
+        Total=("is_closed", "size"),
+        Closed=("is_closed", "sum"),
+        By_PR=("pr_closed", "sum"),
+        By_Commit=("commit_closed", "sum"),
+    )
+    summary["By_Code"] = summary["By_PR"] + summary["By_Commit"]
+    
+    closed = summary["Closed"].where(summary["Closed"] > 0)
+    summary["% Code"] = (summary["By_Code"] / closed * 100).round(2).fillna(0.0)
+    summary["% PR"] = (summary["By_PR"] / closed * 100).round(2).fillna(0.0)
+    summary["% Commit"] = (summary["By_Commit"] / closed * 100).round(2).fillna(0.0)
+    summary.index = summary.index.astype(object).rename("Classification")
     
     print("\nBreakdown by Classification:")
     print(summary.to_string())
@@ -509,7 +515,7 @@ def analyze_issues_per_repo(df):
         return
 
     counts = (
-        df.groupby(["project", "bug_type"])
+        df.groupby(["project", "bug_type"], observed=True)
         .size()
         .unstack(fill_value=0)
         .reset_index()
@@ -521,7 +527,7 @@ def analyze_issues_per_repo(df):
     print("\n" + counts.to_string(index=False))
 
 
-def export_closer_summary(df, output_path="closed_by_summary.txt"):
+def export_closer_summary(df, output_path="closed_by_summary.txt", groups=None):
     """
     Export detailed information about who closed issues to a text file.
     Includes overall counts and per-class breakdowns.
@@ -533,27 +539,30 @@ def export_closer_summary(df, output_path="closed_by_summary.txt"):
     overall_counts = df["closed_by_username"].value_counts()
 
     per_class_counts = (
-        df.groupby("bug_type")["closed_by_username"]
+        _class_groups(df, groups)["closed_by_username"]
           .value_counts()
           .rename("count")
           .reset_index()
     )
+    per_class_counts = per_class_counts[per_class_counts["count"] > 0]
 
-    with open(output_path, "w", encoding="utf-8") as f:
+    # Tables are formatted straight into the 1MB file buffer, one class at a time
+    with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as f:
         f.write("GITHUB ISSUE CLOSER ANALYSIS\n")
         f.write("="*70 + "\n\n")
         
         f.write("Top Closers (All Issues)\n")
         f.write("-"*70 + "\n")
-        f.write(overall_counts.to_string() + "\n\n")
+        overall_counts.to_string(buf=f)
+        f.write("\n\n")
 
         f.write("\nBreakdown by Classification\n")
         f.write("="*70 + "\n")
-        for cls in sorted(per_class_counts["bug_type"].unique()):
-            subset = per_class_counts[per_class_counts["bug_type"] == cls]
+        by_class = per_class_counts.astype({"bug_type": object}).groupby("bug_type", sort=True)
+        for cls, subset in by_class:
             f.write(f"\n{cls}\n")
             f.write("-"*70 + "\n")
-            f.write(subset[["closed_by_username", "count"]].to_string(index=False))
+            subset[["closed_by_username", "count"]].to_string(buf=f, index=False)
             f.write("\n")
 
     print(f"\n Exported closer summary to: {output_path}")
@@ -573,21 +582,37 @@ def _setup_plot_style():
 def _draw_sankey_flow(ax, df):
     """Draw Sankey-style flow diagram on given axes."""
     bug_types = BUG_TYPES_ORDER
-    bug_counts = df['bug_type'].value_counts().reindex(bug_types)
+    
+    # Class x state counts from one bincount over the bug_type codes
+    # (code * 2 + is_closed), instead of a value_counts and two groupbys
+    categories = df['bug_type'].cat.categories
+    codes = df['bug_type'].cat.codes.to_numpy().astype(np.intp)
+    known = codes >= 0
+    state_counts = np.bincount(codes[known] * 2 + df['is_closed'].to_numpy()[known],
+                               minlength=2 * len(categories)).reshape(-1, 2)
+    state_counts = (pd.DataFrame(state_counts, index=categories, columns=['open', 'closed'])
+                      .reindex(bug_types, fill_value=0))
+    bug_counts = state_counts.sum(axis=1)
+    state_closed = state_counts['closed']
+    state_open = state_counts['open']
     
     left_x, right_x = 0, 1
     total_height = sum(bug_counts.values)
     
+    # Rectangles and flows are gathered and added as one collection each
+    rects, rect_colors = [], []
+    flows, flow_colors = [], []
+    
     # Draw left rectangles (bug types)
     y_pos = 0
     left_positions = {}
     for bug_type in bug_types:
-        if bug_type in bug_counts.index and pd.notna(bug_counts[bug_type]):
+        # Classes with no issues get no rectangle or labels, as before the
+        # counts were reindexed to every class
+        if bug_counts[bug_type] > 0:
             height = bug_counts[bug_type] / total_height
-            rect = Rectangle((left_x, y_pos), 0.12, height,
-                            facecolor=COLOR_PALETTE[bug_type], edgecolor='white', 
-                            linewidth=2, alpha=0.85)
-            ax.add_patch(rect)
+            rects.append(Rectangle((left_x, y_pos), 0.12, height))
+            rect_colors.append(COLOR_PALETTE[bug_type])
             ax.text(left_x - 0.01, y_pos + height/2, f'{bug_type}',
                    ha='right', va='center', fontsize=10, fontweight='bold')
             ax.text(left_x + 0.06, y_pos + height/2, f'{bug_counts[bug_type]}',
@@ -596,25 +621,20 @@ def _draw_sankey_flow(ax, df):
             y_pos += height
     
     # Draw right rectangles (states)
-    state_closed = df[df['is_closed']].groupby('bug_type').size()
-    state_open = df[~df['is_closed']].groupby('bug_type').size()
-    
     total_closed = df['is_closed'].sum()
     total_open = (~df['is_closed']).sum()
     closed_height = total_closed / total_height
     open_height = total_open / total_height
     
-    rect_closed = Rectangle((right_x - 0.12, 0), 0.12, closed_height,
-                            facecolor='#2ecc71', edgecolor='white', linewidth=2, alpha=0.85)
-    ax.add_patch(rect_closed)
+    rects.append(Rectangle((right_x - 0.12, 0), 0.12, closed_height))
+    rect_colors.append('#2ecc71')
     ax.text(right_x + 0.01, closed_height/2, f'Closed',
            ha='left', va='center', fontsize=10, fontweight='bold')
     ax.text(right_x - 0.06, closed_height/2, f'{int(total_closed)}',
            ha='center', va='center', fontsize=9, color='white', fontweight='bold')
     
-    rect_open = Rectangle((right_x - 0.12, closed_height), 0.12, open_height,
-                          facecolor='#e74c3c', edgecolor='white', linewidth=2, alpha=0.85)
-    ax.add_patch(rect_open)
+    rects.append(Rectangle((right_x - 0.12, closed_height), 0.12, open_height))
+    rect_colors.append('#e74c3c')
     ax.text(right_x + 0.01, closed_height + open_height/2, f'Open',
            ha='left', va='center', fontsize=10, fontweight='bold')
     ax.text(right_x - 0.06, closed_height + open_height/2, f'{int(total_open)}',
@@ -644,7 +664,8 @@ def _draw_sankey_flow(ax, df):
                  cumulative_closed, 
                  cumulative_closed + closed_flow_height,
                  left_y_start + (closed_count/total_count) * left_height]
-            ax.fill(x, y, color=COLOR_PALETTE[bug_type], alpha=0.25, edgecolor='none')
+            flows.append(list(zip(x, y)))
+            flow_colors.append(COLOR_PALETTE[bug_type])
             cumulative_closed += closed_flow_height
 
         if open_count > 0:
@@ -655,9 +676,14 @@ def _draw_sankey_flow(ax, df):
                  cumulative_open,
                  cumulative_open + open_flow_height,
                  left_y_end]
-            ax.fill(x, y, color=COLOR_PALETTE[bug_type], alpha=0.25, edgecolor='none')
+            flows.append(list(zip(x, y)))
+            flow_colors.append(COLOR_PALETTE[bug_type])
             cumulative_open += open_flow_height
     
+    ax.add_collection(PatchCollection(rects, facecolors=rect_colors, edgecolors='white',
+                                      linewidths=2, alpha=0.85))
+    ax.add_collection(PolyCollection(flows, facecolors=flow_colors, edgecolors='none', alpha=0.25))
+    
     ax.set_xlim(-0.22, 1.22)
     ax.set_ylim(0, 1)
     ax.set_aspect('equal')
@@ -675,32 +701,25 @@ def _draw_repo_distribution(ax, df):
                     ha='center', va='center', transform=ax.transAxes)
             return
 
-    project_data = []
-    for project in df['project'].unique():
-        project_df = df[df['project'] == project]
-        total = len(project_df)
-        if total >= 2:  
-            for bug_type in ['Intrinsic', 'Extrinsic', 'Not  a Bug']:
-                count = len(project_df[project_df['bug_type'] == bug_type])
-                project_data.append({
-                    'project': project,
-                    'bug_type': bug_type,
-                    'proportion': count / total
-                })
-    
-    if not project_data:
+    bug_types_plot = ['Intrinsic', 'Extrinsic', 'Not  a Bug']
+    colors_list = [COLOR_PALETTE[bt] for bt in bug_types_plot]
+    
+    # Project x bug type counts in one grouped pass, as proportions of each
+    # project's issues (for projects with at least 2)
+    projects = df['project'].dropna().unique()
+    totals = df['project'].value_counts().reindex(projects)
+    counts = (df.groupby(['project', 'bug_type'], observed=True).size()
+                .unstack(fill_value=0)
+                .reindex(index=projects, columns=bug_types_plot, fill_value=0))
+    enough = totals >= 2
+    proportions = counts[enough].div(totals[enough], axis=0)
+    
+    if proportions.empty:
         ax.text(0.5, 0.5, 'Insufficient project data', 
                 ha='center', va='center', transform=ax.transAxes)
         return
     
-    consensus_df = pd.DataFrame(project_data)
-    bug_types_plot = ['Intrinsic', 'Extrinsic', 'Not  a Bug']
-    colors_list = [COLOR_PALETTE[bt] for bt in bug_types_plot]
-    
-    data_to_plot = []
-    for bug_type in bug_types_plot:
-        bug_data = consensus_df[consensus_df['bug_type'] == bug_type]['proportion'].values
-        data_to_plot.append(bug_data)
+    data_to_plot = [proportions[bug_type].to_numpy() for bug_type in bug_types_plot]
     
     positions = range(len(bug_types_plot))
     
@@ -715,10 +734,12 @@ def _draw_repo_distribution(ax, df):
         patch.set_facecolor(color)
         patch.set_alpha(0.7)
     
-    # Add jittered points
-    for i, bug_type in enumerate(bug_types_plot):
-        bug_data = consensus_df[consensus_df['bug_type'] == bug_type]['proportion'].values
-        x = np.random.normal(i, 0.04, size=len(bug_data))
+    # Add jittered points; one seeded draw covers every bug type, so the
+    # figure is the same from run to run
+    rng = np.random.default_rng(0)
+    jitter = rng.normal(0, 0.04, size=(len(bug_types_plot), len(proportions)))
+    for i, bug_data in enumerate(data_to_plot):
+        x = i + jitter[i]
         ax.scatter(x, bug_data, alpha=0.25, s=20, color=colors_list[i], 
                    edgecolors='black', linewidth=0.3)
     
@@ -779,8 +800,12 @@ def _draw_time_to_close(ax, df):
         n = len(df_closed[df_closed['bug_type'] == bug_type])
         ax.text(i, ax.get_ylim()[1] * 0.95, f'n={n}', ha='center', fontsize=8)
 
-def generate_comprehensive_figure(df, outdir="figures"):
-    """Generate comprehensive multi-panel analysis figure."""
+def _save_options(fmt):
+    """savefig keyword arguments for an output format; only PNG goes through Pillow."""
+    return {'pil_kwargs': PNG_SAVE_OPTIONS} if fmt == 'png' else {}
+
+def generate_comprehensive_figure(df, outdir="figures", fmt="png"):
+    """Generate comprehensive multi-panel analysis figure (fmt: "png" or "svg")."""
     os.makedirs(outdir, exist_ok=True)
     _setup_plot_style()
     
@@ -808,61 +833,62 @@ def generate_comprehensive_figure(df, outdir="figures"):
     fig.suptitle('Comprehensive Bug Classification Analysis', 
                 fontsize=16, fontweight='bold', y=0.995)
     
-    plt.savefig(os.path.join(outdir, "comprehensive_analysis.png"), 
-                dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(os.path.join(outdir, f"comprehensive_analysis.{fmt}"), 
+                dpi=300, bbox_inches='tight', facecolor='white', **_save_options(fmt))
     plt.close()
     
-    print(f"\n Generated comprehensive figure: {outdir}/comprehensive_analysis.png")
+    print(f"\n Generated comprehensive figure: {outdir}/comprehensive_analysis.{fmt}")
 
-def generate_standalone_figures(df, outdir="figures"):
-    """Generate individual figures for each panel."""
+def generate_standalone_figures(df, outdir="figures", fmt="png"):
+    """Generate individual figures for each panel (fmt: "png" or "svg")."""
     os.makedirs(outdir, exist_ok=True)
     _setup_plot_style()
     
+    # One figure (and canvas) is cleared and resized between panels instead of
+    # making three; clf() rather than cla() so the Sankey's aspect doesn't carry over
+    fig, ax = plt.subplots(figsize=(10, 6), constrained_layout=True)
+    
     # Sankey flow
-    fig, ax = plt.subplots(figsize=(10, 6))
     _draw_sankey_flow(ax, df)
     ax.set_title('Bug Classification Flow to Issue State', 
                  fontsize=14, fontweight='bold', pad=15)
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "sankey_flow.png"), 
-                dpi=300, bbox_inches='tight', facecolor='white')
-    plt.close()
+    fig.savefig(os.path.join(outdir, f"sankey_flow.{fmt}"), 
+                dpi=150, facecolor='white', **_save_options(fmt))
     
     # Repository distribution
-    fig, ax = plt.subplots(figsize=(8, 6))
+    fig.clf()
+    fig.set_size_inches(8, 6)
+    ax = fig.add_subplot()
     _draw_repo_distribution(ax, df)
     ax.set_title('Distribution of Bug Type Proportions Across Repositories', 
                  fontsize=14, fontweight='bold', pad=15)
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "repo_distribution.png"), 
-                dpi=300, bbox_inches='tight', facecolor='white')
-    plt.close()
+    fig.savefig(os.path.join(outdir, f"repo_distribution.{fmt}"), 
+                dpi=150, facecolor='white', **_save_options(fmt))
     
     # Time to close
-    fig, ax = plt.subplots(figsize=(8, 6))
+    fig.clf()
+    ax = fig.add_subplot()
     _draw_time_to_close(ax, df)
     ax.set_title('Resolution Time Distribution by Bug Type', 
                  fontsize=14, fontweight='bold', pad=15)
-    plt.tight_layout()
-    plt.savefig(os.path.join(outdir, "time_to_close.png"), 
-                dpi=300, bbox_inches='tight', facecolor='white')
-    plt.close()
+    fig.savefig(os.path.join(outdir, f"time_to_close.{fmt}"), 
+                dpi=150, facecolor='white', **_save_options(fmt))
+    plt.close(fig)
     
     print(f" Generated standalone figures in: {outdir}/")
-    print("  - sankey_flow.png")
-    print("  - repo_distribution.png")
-    print("  - time_to_close.png")
+    print(f"  - sankey_flow.{fmt}")
+    print(f"  - repo_distribution.{fmt}")
+    print(f"  - time_to_close.{fmt}")
 
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
 
 def main():
-    import sys
-    
     # Get input file from command line or use default
     input_file = sys.argv[1] if len(sys.argv) > 1 else "issues_with_classifications.jsonl"
+    # Optional figure format: "png" (default) or "svg", which skips PNG encoding
+    fig_format = sys.argv[2] if len(sys.argv) > 2 else "png"
     
     print("\n" + "="*70)
     print("GITHUB ISSUE ANALYSIS")
@@ -872,34 +898,42 @@ def main():
     # Load data
     df = load_data(input_file)
     
-    # Run all analyses
-    analyze_bot_closures(df)
-    analyze_class_distribution(df)
-    analyze_closed_ratio(df)
-    analyze_comments(df)
-    
-    analyze_time_to_close(df)
-    analyze_time_to_first_response(df)
-    
-    analyze_maintainer_involvement(df)
-    analyze_maintainer_ratio(df)
-    
-    analyze_reopens(df)
-    
-    analyze_labels(df)
+    # One bug_type GroupBy shared by the analyzers that group the whole frame
+    groups = df.groupby("bug_type", observed=True)
     
-    analyze_code_changes(df)
-    analyze_change_effort(df)
-    
-    analyze_closure_methods(df)
-    
-    analyze_issues_per_repo(df)
+    # Run all analyses in order. They share the GroupBy, whose lazy caches
+    # pandas does not make thread-safe, and each takes well under a second
+    sections = [
+        partial(analyze_bot_closures, groups=groups),
+        analyze_class_distribution,
+        partial(analyze_closed_ratio, groups=groups),
+        partial(analyze_comments, groups=groups),
+        
+        partial(analyze_time_to_close, groups=groups),
+        analyze_time_to_first_response,
+        
+        analyze_maintainer_involvement,
+        analyze_maintainer_ratio,
+        
+        analyze_reopens,
+        
+        analyze_labels,
+        
+        analyze_code_changes,
+        analyze_change_effort,
+        
+        partial(analyze_closure_methods, groups=groups),
+        
+        analyze_issues_per_repo,
+    ]
+    for section in sections:
+        section(df)
     
-    export_closer_summary(df)
+    export_closer_summary(df, groups=groups)
     
     # Generate figures
-    generate_comprehensive_figure(df)
-    generate_standalone_figures(df)
+    generate_comprehensive_figure(df, fmt=fig_format)
+    generate_standalone_figures(df, fmt=fig_format)
     
     print("\n" + "="*70)
     print("ANALYSIS COMPLETE")
@@ -0,0 +1,58 @@
+import hashlib
+import orjson
+import os
+import sqlite3
+import threading
+
+
+def prompt_key(prompt, model_name):
+    """Hash the model and the full prompt (guide, repo and issue) a classification is made from"""
+    return hashlib.sha256((model_name + '\x00' + prompt).encode('utf-8')).hexdigest()
+
+
+class ClassificationCache:
+    def __init__(self, db_path="data/.classify_cache.sqlite"):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # One connection shared by the classification worker threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                sha256 TEXT PRIMARY KEY,
+                classification TEXT,
+                reasoning TEXT,
+                probabilities TEXT,
+                raw TEXT
+            )
+        """)
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached classification dict, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT classification, reasoning, probabilities, raw FROM classifications WHERE sha256 = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'classification': row[0],
+            'reasoning': row[1],
+            'probabilities': orjson.loads(row[2]),
+            'raw_response': row[3]
+        }
+
+    def put(self, key, result):
+        """Store a classification dict"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?)",
+                (key, result['classification'], result['reasoning'],
+                 orjson.dumps(result.get('probabilities', {})).decode('utf-8'), result.get('raw_response', ''))
+            )
+            self.conn.commit()
@@ -1,28 +1,87 @@
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from tools.classification_cache import prompt_key
+
+# Response patterns, compiled once for every issue
+_FINAL_ANSWER_RE = re.compile(r"\*\*Final Answer:\*\*\s*(Intrinsic|Extrinsic|Not a Bug|Unknown)", re.IGNORECASE)
+
+# All four probabilities in one pass; matched against the lower-cased response
+_PROBABILITY_RE = re.compile(r'(intrinsic|extrinsic|not a bug|unknown):\s*(0\.\d+)')
+_PROBABILITY_KEYS = {
+    'intrinsic': 'INTRINSIC',
+    'extrinsic': 'EXTRINSIC',
+    'not a bug': 'NOT_A_BUG',
+    'unknown': 'UNKNOWN'
+}
+
+# Lower-cases A-Z only, so offsets line up with the original text
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+@lru_cache(maxsize=1)
+def _classification_prompt():
+    """Load the classification guide from file, once per process"""
+    prompt_file = "classification_prompt.txt"
+    
+    if not os.path.exists(prompt_file):
+        raise FileNotFoundError(f"{prompt_file} not found. Please create it with your classification guide.")
+    
+    with open(prompt_file, 'r', encoding='utf-8') as f:
+        return f.read()
 
 class BugClassifier:
-    def __init__(self, model_url="http://localhost:11434", model_name="gpt-oss:20b"):        
+    def __init__(self, model_url="http://localhost:11434", model_name="gpt-oss:20b", max_connections=4):        
         self.model_url = model_url
         self.model_name = model_name
-        self.classification_prompt = self._load_prompt()
-    
-    def _load_prompt(self):
-        """Load the classification guide from file"""
-        prompt_file = "classification_prompt.txt"
+        self.classification_prompt = _classification_prompt()
+        self.prompt_prefix = self.classification_prompt + "\n\n\n\n    NOW CLASSIFY THIS ISSUE:\n\n"
         
-        if not os.path.exists(prompt_file):
-            raise FileNotFoundError(f"{prompt_file} not found. Please create it with your classification guide.")
+        # Keep-alive connections to Ollama, reused across classify() calls; one
+        # per thread that classifies concurrently
+        self.session = requests.Session()
+        self.session.mount(model_url, HTTPAdapter(pool_connections=1, pool_maxsize=max_connections))
         
-        with open(prompt_file, 'r', encoding='utf-8') as f:
-            return f.read()
+        # In-process memo of recent results, keyed like the on-disk cache
+        self.memo = OrderedDict()
+        self.memo_size = 4096
+        self.memo_lock = threading.Lock()
     
-    def classify(self, issue_data):
-        """Classify a single issue"""
-        
-        # Build the full prompt
+    def prepare(self, issue_data):
+        """The prompt for an issue and the cache key of its result (model + full prompt)"""
         prompt = self._build_prompt(issue_data)
+        return prompt, prompt_key(prompt, self.model_name)
+    
+    def classify(self, issue_data, prepared=None):
+        """Classify a single issue, reusing the result for a prompt seen before
+        
+        prepared is prepare(issue_data), for callers that already needed the key
+        """
+        
+        prompt, key = prepared or self.prepare(issue_data)
+        with self.memo_lock:
+            cached = self.memo.get(key)
+            if cached is not None:
+                self.memo.move_to_end(key)
+                return dict(cached)
+        
+        result = self._classify(prompt)
+        
+        # Errors are not memoized so the issue is retried next time
+        if 'raw_response' in result:
+            with self.memo_lock:
+                self.memo[key] = result
+                if len(self.memo) > self.memo_size:
+                    self.memo.popitem(last=False)
+        
+        return dict(result)
+    
+    def _classify(self, prompt):
+        """Classify a single issue's prompt with the model"""
         
         # Call Ollama
         try:
@@ -42,6 +101,11 @@ class BugClassifier:
                 'probabilities': {}
             }
     
+    @staticmethod
+    def _cap(text, limit):
+        """text cut to limit characters; short text is returned as is"""
+        return text if len(text) <= limit else text[:limit]
+    
     def _build_prompt(self, issue_data):
         """Build the complete prompt with issue data"""
         
@@ -59,90 +123,117 @@ class BugClassifier:
         else:
             labels_str = 'None'
         
-        # Format closing PR details
-        closing_pr_section = ""
+        author = issue_data.get('author', {})
+        
+        # A missing or null body / comments field reads "No description" /
+        # "No comments"; an empty string is passed through as is
+        body = issue_data.get('body')
+        comments = issue_data.get('comments_md')
+        
+        # The issue section is built from pieces and joined once
+        parts = [
+            f"    **Bug Project:** {full_repo}\n",
+            f"    **Bug Title:** {issue_data.get('title', 'No title')}\n",
+            f"    **Bug Number:** #{issue_data.get('number', 'Unknown')}\n\n",
+            "    **Bug Description:** \n",
+            f"    {self._cap('No description' if body is None else body, 3000)}\n\n",
+            f"    **Labels:** {labels_str}\n",
+            f"    **State:** {issue_data.get('state', 'unknown')}\n",
+            f"    **Created:** {issue_data.get('created_at', 'Unknown')}\n",
+            f"    **Closed:** {issue_data.get('closed_at', 'Not closed')}\n\n",
+            f"    **Author:** {author.get('username', 'Unknown')} (Role: {author.get('author_association', 'NONE')})\n",
+            "    ",
+        ]
+        
+        # Closing PR details
         if issue_data.get('closing_pr'):
             pr = issue_data['closing_pr']
-            closing_pr_section = f"""
-
-    **Closing PR:**
-    - Number: #{pr.get('number')}
-    - Title: {pr.get('title')}
-    - Body: {pr.get('body', '')[:2000]}
-    - Merged: {pr.get('merged')}
-    - Files Changed: {pr.get('changed_files')}
-    - Additions: {pr.get('additions')}
-    - Deletions: {pr.get('deletions')}
-    """
-        
-        # Format closing commit details
-        closing_commit_section = ""
+            parts += [
+                "\n\n    **Closing PR:**\n",
+                f"    - Number: #{pr.get('number')}\n",
+                f"    - Title: {pr.get('title')}\n",
+                f"    - Body: {self._cap(pr.get('body') or '', 2000)}\n",
+                f"    - Merged: {pr.get('merged')}\n",
+                f"    - Files Changed: {pr.get('changed_files')}\n",
+                f"    - Additions: {pr.get('additions')}\n",
+                f"    - Deletions: {pr.get('deletions')}\n",
+                "    ",
+            ]
+        
+        # Closing commit details
         if issue_data.get('closing_commit'):
             commit = issue_data['closing_commit']
-            closing_commit_section = f"""
-
-    **Closing Commit:**
-    - SHA: {commit.get('sha', '')[:7]}
-    - Message: {commit.get('message', '')[:500]}
-    """
+            parts += [
+                "\n\n    **Closing Commit:**\n",
+                f"    - SHA: {commit.get('sha', '')[:7]}\n",
+                f"    - Message: {self._cap(commit.get('message') or '', 500)}\n",
+                "    ",
+            ]
         
-        issue_section = f"""
-
-    NOW CLASSIFY THIS ISSUE:
-
-    **Bug Project:** {full_repo}
-    **Bug Title:** {issue_data.get('title', 'No title')}
-    **Bug Number:** #{issue_data.get('number', 'Unknown')}
-
-    **Bug Description:** 
-    {issue_data.get('body', 'No description')[:3000]}
-
-    **Labels:** {labels_str}
-    **State:** {issue_data.get('state', 'unknown')}
-    **Created:** {issue_data.get('created_at', 'Unknown')}
-    **Closed:** {issue_data.get('closed_at', 'Not closed')}
-
-    **Author:** {issue_data.get('author', {}).get('username', 'Unknown')} (Role: {issue_data.get('author', {}).get('author_association', 'NONE')})
-    {closing_pr_section}{closing_commit_section}
-
-    **Comments (Discussion):**
-    {issue_data.get('comments_md', 'No comments')[:4000]}
-
-    ---
-
-    Please analyze this issue using the framework provided.
-    """
+        parts += [
+            "\n\n    **Comments (Discussion):**\n",
+            f"    {self._cap('No comments' if comments is None else comments, 4000)}\n\n",
+            "    ---\n\n",
+            "    Please analyze this issue using the framework provided.\n",
+            "    ",
+        ]
         
-        return self.classification_prompt + "\n\n" + issue_section
+        # Static guide first, issue last: every request shares the same prefix
+        return self.prompt_prefix + ''.join(parts)
     
     def _call_ollama(self, prompt):
-        """Call Ollama API"""
+        """Call Ollama API, streaming until the answer and probabilities are in"""
         
-        response = requests.post(
+        with self.session.post(
             f"{self.model_url}/api/generate",
             json={
                 'model': self.model_name,
                 'prompt': prompt,
                 'temperature': 0.2,
-                'stream': False,
+                'stream': True,
+                'keep_alive': -1,  # Stay loaded so the shared prompt prefix stays cached across issues
                 'options': {
                     'num_predict': 32000,
                 }
             },
+            stream=True,
             timeout=300  # 5 minute timeout for long responses
-        )
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code}")
+            
+            chunks = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = chunk.get('response', '')
+                chunks.append(text)
+                if chunk.get('done'):
+                    break
+                
+                # Leaving the with block drops the connection, which makes
+                # Ollama stop generating the rest of the budget
+                if '\n' in text and self._is_complete(''.join(chunks)):
+                    break
+            
+            return ''.join(chunks)
+    
+    def _is_complete(self, response):
+        """True once the final answer and every probability are on finished lines"""
         
-        if response.status_code == 200:
-            return response.json()['response']
-        else:
-            raise Exception(f"Ollama API error: {response.status_code}")
+        finished = response[:response.rfind('\n')]
+        
+        if not _FINAL_ANSWER_RE.search(finished):
+            return False
+        
+        return len(self._extract_probabilities(finished)) == len(_PROBABILITY_KEYS)
     
     def _parse_classification(self, response):
         """Extract the final classification"""
         
         # Look for "**Final Answer:** [CATEGORY]"
-        pattern = r"\*\*Final Answer:\*\*\s*(Intrinsic|Extrinsic|Not a Bug|Unknown)"
-        match = re.search(pattern, response, re.IGNORECASE)
+        match = _FINAL_ANSWER_RE.search(response)
         
         if match:
             answer = match.group(1)
@@ -160,21 +251,39 @@ class BugClassifier:
     def _extract_reasoning(self, response):
         """Extract the reasoning section"""
         
-        lines = response.split('\n')
-        reasoning_lines = []
-        in_reasoning = False
+        # The section runs from the line after the first "reasoning:" up to the
+        # first line, other than another "reasoning:" line, that starts the
+        # final answer or probability distribution
+        lowered = response.lower()
+        if len(lowered) != len(response):
+            lowered = response.translate(_ASCII_LOWER)
         
-        for line in lines:
-            if 'reasoning:' in line.lower() or '**reasoning:**' in line.lower():
-                in_reasoning = True
-                continue
-            
-            if in_reasoning:
-                if '**final answer:**' in line.lower() or 'probability distribution' in line.lower():
+        reasoning = ''
+        marker = lowered.find('reasoning:')
+        start = lowered.find('\n', marker) + 1 if marker >= 0 else 0
+        if start:
+            end = len(response)
+            pos = start
+            while True:
+                hits = [i for i in (lowered.find('**final answer:**', pos),
+                                    lowered.find('probability distribution', pos)) if i >= 0]
+                if not hits:
                     break
-                reasoning_lines.append(line)
+                line_start = lowered.rfind('\n', 0, min(hits)) + 1
+                line_end = lowered.find('\n', min(hits))
+                if line_end < 0:
+                    line_end = len(response)
+                if lowered.find('reasoning:', line_start, line_end) < 0:
+                    end = line_start
+                    break
+                pos = line_end
+            reasoning = response[start:end]
+            
+            # Further "reasoning:" lines inside the section are left out
+            if lowered.find('reasoning:', start, end) >= 0:
+                reasoning = '\n'.join(line for line in reasoning.split('\n') if 'reasoning:' not in line.lower())
         
-        reasoning = '\n'.join(reasoning_lines).strip()
+        reasoning = reasoning.strip()
         
         if not reasoning:
             try:
@@ -189,16 +298,8 @@ class BugClassifier:
         
         probabilities = {}
         
-        patterns = {
-            'INTRINSIC': r'Intrinsic:\s*(0\.\d+)',
-            'EXTRINSIC': r'Extrinsic:\s*(0\.\d+)',
-            'NOT_A_BUG': r'Not a Bug:\s*(0\.\d+)',
-            'UNKNOWN': r'Unknown:\s*(0\.\d+)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                probabilities[key] = float(match.group(1))
+        # The first value given for each label wins
+        for match in _PROBABILITY_RE.finditer(response.lower()):
+            probabilities.setdefault(_PROBABILITY_KEYS[match.group(1)], float(match.group(2)))
         
         return probabilities
\ No newline at end of file
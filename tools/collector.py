@@ -1,7 +1,10 @@
 from github import Github
 import os
 import requests
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 class IssueCollector:
@@ -10,12 +13,27 @@ class IssueCollector:
         if not token:
             raise ValueError("GitHub token required. Set GITHUB_TOKEN environment variable.")
         
-        self.gh = Github(token)
+        # 100 issues per listing page (the API maximum) instead of the default 30
+        self.gh = Github(token, per_page=100)
         self.token = token
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github+json"
         }
+        
+        # Shared keep-alive connections for the REST calls
+        self.session = requests.Session()
+        
+        # url -> (etag, data) for the most recent fetches; repeat fetches
+        # revalidate and get a 304 when unchanged
+        self.etag_cache = OrderedDict()
+        self.etag_cache_size = 512
+        self.etag_lock = threading.Lock()
+        
+        # Issues whose details are fetched at the same time. Workers only make
+        # REST calls through self.session; anything read through the shared
+        # Github client is fetched on the calling thread (see collect)
+        self.max_workers = 10
     
     def collect(self, repo_name, limit=10):
         """Collect issues from a repository with full details"""
@@ -31,20 +49,29 @@ class IssueCollector:
         # Get issues
         issues = repo.get_issues(state='all')
         
-        # Collect until we have 'limit' non-PR issues
-        collected = []
-        for issue in issues:
-            if issue.pull_request:
-                continue  # Skip pull requests
-            
-            print(f"   Fetching #{issue.number}: {issue.title[:60]}...")
-            
-            # Get full details
-            issue_data = self._extract_full_issue_data(issue, repo_name)
-            collected.append(issue_data)
-            
-            if len(collected) >= limit:
-                break
+        # Pick the first 'limit' non-PR issues. Each one's full details start
+        # fetching as soon as it is listed, so later listing pages overlap them
+        futures = []
+        if limit > 0:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, limit)) as pool:
+                for issue in issues:
+                    if issue.pull_request:
+                        continue  # Skip pull requests
+                    
+                    print(f"   Fetching #{issue.number}: {issue.title[:60]}...")
+                    
+                    # closed_by and raw_data are not in the listing payload, and
+                    # PyGithub would fetch them lazily from the worker through the
+                    # shared Github client; completing the issue here keeps every
+                    # PyGithub request on this thread
+                    issue.raw_data
+                    futures.append(pool.submit(self._extract_full_issue_data, issue, repo_name))
+                    
+                    if len(futures) >= limit:
+                        break
+        
+        # Results keep the listing order
+        collected = [future.result() for future in futures]
         
         print(f"   Found {len(collected)} issues")
         return collected
@@ -352,55 +379,18 @@ class IssueCollector:
             timeline_headers = self.headers.copy()
             timeline_headers["Accept"] = "application/vnd.github.mockingbird-preview+json"
             
-            items = []
-            page = 1
-            while True:
-                r = requests.get(f"{url}?per_page=100&page={page}", headers=timeline_headers)
-                
-                # Handle rate limiting
-                if r.status_code == 403 and r.headers.get("X-RateLimit-Remaining") == "0":
-                    reset = int(r.headers.get("X-RateLimit-Reset", 0))
-                    sleep_time = max(0, reset - int(time.time()) + 1)
-                    print(f"   Rate limited, sleeping {sleep_time}s...")
-                    time.sleep(sleep_time)
-                    continue
-                
-                r.raise_for_status()
-                data = r.json()
-                
-                if not data:
-                    break
-                
-                items.extend(data)
-                
-                if len(data) < 100:
-                    break
-                
-                page += 1
-            
-            return items
+            return self._fetch_paginated(url, timeline_headers)
         except Exception as e:
             print(f"   Could not fetch timeline: {e}")
             return []
     
-    def _fetch_paginated(self, url):
+    def _fetch_paginated(self, url, headers=None):
         """Fetch all pages of data"""
         items = []
         page = 1
         
         while True:
-            r = requests.get(f"{url}?per_page=100&page={page}", headers=self.headers)
-            
-            # Handle rate limiting
-            if r.status_code == 403 and r.headers.get("X-RateLimit-Remaining") == "0":
-                reset = int(r.headers.get("X-RateLimit-Reset", 0))
-                sleep_time = max(0, reset - int(time.time()) + 1)
-                print(f"   Rate limited, sleeping {sleep_time}s...")
-                time.sleep(sleep_time)
-                continue
-            
-            r.raise_for_status()
-            data = r.json()
+            data = self._fetch(f"{url}?per_page=100&page={page}", headers)
             
             if not data:
                 break
@@ -628,10 +618,19 @@ class IssueCollector:
             print(f"      Error fetching commit details: {e}")
             return None
     
-    def _fetch(self, url):
-        """Fetch with rate limit handling"""
+    def _fetch(self, url, headers=None):
+        """Fetch with rate limit handling and ETag revalidation"""
+        headers = dict(headers or self.headers)
+        
+        with self.etag_lock:
+            cached = self.etag_cache.get(url)
+            if cached:
+                self.etag_cache.move_to_end(url)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        
         while True:
-            r = requests.get(url, headers=self.headers)
+            r = self.session.get(url, headers=headers)
             
             if r.status_code == 403 and r.headers.get("X-RateLimit-Remaining") == "0":
                 reset = int(r.headers.get("X-RateLimit-Reset", 0))
@@ -640,8 +639,22 @@ class IssueCollector:
                 time.sleep(sleep_time)
                 continue
             
+            # Unchanged since the last fetch (304s don't count against the rate limit)
+            if r.status_code == 304 and cached:
+                return cached[1]
+            
             r.raise_for_status()
-            return r.json()
+            data = r.json()
+            
+            etag = r.headers.get("ETag")
+            if etag:
+                with self.etag_lock:
+                    self.etag_cache[url] = (etag, data)
+                    self.etag_cache.move_to_end(url)
+                    if len(self.etag_cache) > self.etag_cache_size:
+                        self.etag_cache.popitem(last=False)
+            
+            return data
     
     def _build_comments_markdown(self, comments):
         """Build markdown transcript of comments"""
@@ -2,16 +2,123 @@ from langchain.tools import Tool
 from pydantic import BaseModel, Field
 from tools.collector import IssueCollector
 from tools.classifier import BugClassifier
+from tools.classification_cache import ClassificationCache
 from typing import Optional
 from dotenv import load_dotenv
-import json
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 from datetime import datetime
+import atexit
 import os
+import threading
 
 load_dotenv()
 
+# classify_bugs is almost always followed by merge_classifications on the same
+# two files, so that merge is started in the background while the LLM decides
+_merge_executor = ThreadPoolExecutor(max_workers=1)
+_speculative_merges = {}
+_speculative_lock = threading.Lock()
+
+# Issues are classified independently, so keep as many requests in flight as
+# the Ollama server decodes concurrently (its OLLAMA_NUM_PARALLEL setting)
+_CLASSIFY_WORKERS = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
 collector = IssueCollector()
-classifier = BugClassifier()
+classifier = BugClassifier(max_connections=_CLASSIFY_WORKERS)
+
+# Opened on first use, so importing this module doesn't create data/ and the sqlite file
+_classification_cache = None
+_classification_cache_lock = threading.Lock()
+
+# Result timestamps are refreshed every this many issues rather than per issue
+_TIMESTAMP_EVERY = 50
+
+
+def _get_classification_cache():
+    """The shared ClassificationCache, opened by whichever worker needs it first"""
+    global _classification_cache
+    with _classification_cache_lock:
+        if _classification_cache is None:
+            _classification_cache = ClassificationCache()
+        return _classification_cache
+
+
+def _classify_cached(issue):
+    """Classify an issue, reusing the stored answer when its prompt is unchanged"""
+    cache = _get_classification_cache()
+    prepared = classifier.prepare(issue)
+    key = prepared[1]
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    classification = classifier.classify(issue, prepared)
+    
+    # Failed calls come back without a raw response; let them retry next run
+    if 'raw_response' in classification:
+        cache.put(key, classification)
+    return classification
+
+
+def _classify_in_parallel(issues):
+    """Yield classifications in issue order while several requests run at once"""
+    with ThreadPoolExecutor(max_workers=_CLASSIFY_WORKERS) as pool:
+        yield from pool.map(_classify_cached, issues)
+
+
+def _start_speculative_merge(collected_file, results_file):
+    """Merge classify_bugs output into a temp file ahead of the agent asking for it"""
+    _discard_speculative_merges()
+    tmp_file = f"{results_file}.merged.tmp"
+    future = _merge_executor.submit(merge_classifications, collected_file, results_file, tmp_file, verbose=False)
+    key = (os.path.normpath(collected_file), os.path.normpath(results_file))
+    with _speculative_lock:
+        _speculative_merges[key] = (future, tmp_file)
+
+
+def _discard_speculative_merges():
+    """Drop speculative merges the agent never asked for, and their temp files"""
+    with _speculative_lock:
+        speculative = list(_speculative_merges.values())
+        _speculative_merges.clear()
+    
+    for future, tmp_file in speculative:
+        # A merge that has not started is cancelled; a running one is waited for
+        if not future.cancel():
+            future.result()
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+# Don't leave .merged.tmp files behind when the agent exits
+atexit.register(_discard_speculative_merges)
+
+
+def _take_speculative_merge(collected_file, results_file, output_file):
+    """Return the summary of a matching speculative merge moved to output_file, or None"""
+    key = (os.path.normpath(collected_file), os.path.normpath(results_file))
+    with _speculative_lock:
+        speculative = _speculative_merges.pop(key, None)
+    if speculative is None:
+        return None
+    
+    future, tmp_file = speculative
+    summary = future.result()
+    if not os.path.exists(tmp_file):
+        return None
+    
+    # A rename when both are on one filesystem; otherwise the caller merges again
+    try:
+        os.replace(tmp_file, output_file)
+    except OSError:
+        os.remove(tmp_file)
+        return None
+    
+    # The temp file was written before the agent asked, so give the output a
+    # fresh mtime for caches keyed on it (tools.analysis.load_data)
+    os.utime(output_file)
+    return summary.replace(tmp_file, output_file)
 
 def list_repositories(owner: str, limit: int = 20) -> str:
     repos = collector.list_repos(owner, limit)
@@ -28,14 +135,16 @@ def list_repositories(owner: str, limit: int = 20) -> str:
     
     return result
 
-def classify_bugs(repo: str, limit: int = 10) -> str:
+def _classify_repo(repo: str, limit: int = 10):
+    """Collect and classify issues; returns (results, results_file, collected_file, log_file) or None"""
     print(f"\n Collecting and classifying {limit} issues from {repo}...\n")
     issues = collector.collect(repo, limit)
     
     if not issues:
-        return f"No issues found in {repo}"
+        return None
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    started = datetime.now()
+    timestamp = started.strftime("%Y%m%d_%H%M%S")
     results_file = f"data/results_{timestamp}.jsonl"
     collected_file = f"data/collected_{timestamp}.jsonl"
     log_file = f"data/classification_{timestamp}.log"
@@ -43,12 +152,14 @@ def classify_bugs(repo: str, limit: int = 10) -> str:
     os.makedirs('data', exist_ok=True)
     
     print(f" Saving collected issues to {collected_file}...")
-    with open(collected_file, 'w', encoding='utf-8') as f:
+    with open(collected_file, 'wb') as f:
         for issue in issues:
-            f.write(json.dumps(issue, ensure_ascii=False) + '\n')
+            f.write(orjson.dumps(issue) + b'\n')
 
-    with open(log_file, 'w', encoding='utf-8') as log:
-        log.write(f"Classification started at {datetime.now().isoformat()}\n")
+    # Results are unbuffered so each one is on disk as soon as it is classified
+    with open(log_file, 'w', encoding='utf-8') as log, \
+         open(results_file, 'ab', buffering=0) as results_out:
+        log.write(f"Classification started at {started.isoformat()}\n")
         log.write(f"Repository: {repo}\n")
         log.write(f"Limit: {limit}\n")
         log.write(f"Total issues collected: {len(issues)}\n")
@@ -56,16 +167,15 @@ def classify_bugs(repo: str, limit: int = 10) -> str:
         log.write("="*80 + "\n\n")
         
         results = []
-        for i, issue in enumerate(issues, 1):
-            print(f"  Classifying {i}/{len(issues)}...")
+        for i, (issue, classification) in enumerate(zip(issues, _classify_in_parallel(issues)), 1):
+            print(f"  Classified {i}/{len(issues)}...")
+            if (i - 1) % _TIMESTAMP_EVERY == 0:
+                classified_at = datetime.now().isoformat()
 
             log.write(f"[{i}/{len(issues)}] Issue #{issue['number']}: {issue['title']}\n")
-            log.flush()
-            
-            classification = classifier.classify(issue)
             
             result = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': classified_at,
                 'repo': repo,
                 'number': issue['number'],
                 'title': issue['title'],
@@ -79,8 +189,7 @@ def classify_bugs(repo: str, limit: int = 10) -> str:
             
             results.append(result)
         
-            with open(results_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+            results_out.write(orjson.dumps(result) + b'\n')
             
             # Log result
             log.write(f"  Classification: {classification['classification']}\n")
@@ -88,6 +197,18 @@ def classify_bugs(repo: str, limit: int = 10) -> str:
             log.write("\n")
             log.flush()
 
+    return results, results_file, collected_file, log_file
+
+
+def classify_bugs(repo: str, limit: int = 10) -> str:
+    classified = _classify_repo(repo, limit)
+    
+    if classified is None:
+        return f"No issues found in {repo}"
+    
+    results, results_file, collected_file, log_file = classified
+    _start_speculative_merge(collected_file, results_file)
+
     intrinsic = len([r for r in results if r['classification'] == 'INTRINSIC'])
     extrinsic = len([r for r in results if r['classification'] == 'EXTRINSIC'])
     not_bug = len([r for r in results if r['classification'] == 'NOT_A_BUG'])
@@ -126,9 +247,9 @@ def collect_bugs(repo: str, limit: int = 10) -> str:
     os.makedirs('data', exist_ok=True)
     
     print(f" Saving collected issues to {collected_file}...")
-    with open(collected_file, 'w', encoding='utf-8') as f:
+    with open(collected_file, 'wb') as f:
         for issue in issues:
-            f.write(json.dumps(issue, ensure_ascii=False) + '\n')
+            f.write(orjson.dumps(issue) + b'\n')
 
     summary = f"""
 Collected {len(issues)} issues from {repo}:
@@ -147,30 +268,39 @@ Top issues:
     return summary
 
 
+def _parse_repo_limit(input_str):
+    """Parse 'owner/repo,limit' tool input; returns (repo, limit, error)"""
+    parts = input_str.split(',')
+    
+    if len(parts) == 1:
+        repo = parts[0].strip()
+        limit = 10
+    elif len(parts) == 2:
+        repo = parts[0].strip()
+        limit_str = parts[1].strip()
+        
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            return None, None, f"Error: limit must be a number, got '{limit_str}'"
+    else:
+        return None, None, f"Error: Invalid input format. Use 'owner/repo,limit' (e.g., 'facebook/react,5')"
+    
+    if '/' not in repo:
+        return None, None, f"Error: Repository must be in 'owner/repo' format (e.g., 'facebook/react', not just 'react')"
+    
+    repo_parts = repo.split('/')
+    if len(repo_parts) != 2:
+        return None, None, f"Error: Repository must be 'owner/repo' format, got '{repo}'"
+    
+    return repo, limit, None
+
+
 def _safe_collect_bugs(input_str):
     try:
-        parts = input_str.split(',')
-        
-        if len(parts) == 1:
-            repo = parts[0].strip()
-            limit = 10
-        elif len(parts) == 2:
-            repo = parts[0].strip()
-            limit_str = parts[1].strip()
-            
-            try:
-                limit = int(limit_str)
-            except ValueError:
-                return f"Error: limit must be a number, got '{limit_str}'"
-        else:
-            return f"Error: Invalid input format. Use 'owner/repo,limit' (e.g., 'facebook/react,5')"
-        
-        if '/' not in repo:
-            return f"Error: Repository must be in 'owner/repo' format (e.g., 'facebook/react', not just 'react')"
-        
-        repo_parts = repo.split('/')
-        if len(repo_parts) != 2:
-            return f"Error: Repository must be 'owner/repo' format, got '{repo}'"
+        repo, limit, error = _parse_repo_limit(input_str)
+        if error:
+            return error
         
         return collect_bugs(repo, limit)
         
@@ -179,38 +309,39 @@ def _safe_collect_bugs(input_str):
 
 
 
-def merge_classifications(collected_file: str, results_file: str, output_file: str = "issues_with_classifications.jsonl") -> str:
-    import json
-    
+def merge_classifications(collected_file: str, results_file: str, output_file: str = "issues_with_classifications.jsonl", verbose: bool = True) -> str:
+    # verbose=False keeps a background merge off the console
     try:
-        print(f"Loading collected data from {collected_file}...")
+        if verbose:
+            print(f"Loading collected data from {collected_file}...")
         collected = {}
-        with open(collected_file, 'r', encoding='utf-8') as f:
+        with open(collected_file, 'rb') as f:
             for line in f:
                 if line.strip():
-                    issue = json.loads(line)
+                    issue = orjson.loads(line)
                     key = (issue['owner'], issue['repo'], issue['number'])
                     collected[key] = issue
         
-        print(f"  Loaded {len(collected)} issues")
-
-        print(f"Loading classifications from {results_file}...")
+        if verbose:
+            print(f"  Loaded {len(collected)} issues")
+            print(f"Loading classifications from {results_file}...")
         classifications = {}
-        with open(results_file, 'r', encoding='utf-8') as f:
+        with open(results_file, 'rb') as f:
             for line in f:
                 if line.strip():
-                    result = json.loads(line)
+                    result = orjson.loads(line)
                     repo_parts = result['repo'].split('/')
                     if len(repo_parts) == 2:
                         owner, repo = repo_parts
                         key = (owner, repo, result['number'])
                         classifications[key] = result
         
-        print(f"  Loaded {len(classifications)} classifications")
-        print(f"Merging...")
+        if verbose:
+            print(f"  Loaded {len(classifications)} classifications")
+            print(f"Merging...")
         merged_count = 0
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with open(output_file, 'wb') as f:
             for key, issue in collected.items():
                 if key in classifications:
                     result = classifications[key]
@@ -239,7 +370,7 @@ def merge_classifications(collected_file: str, results_file: str, output_file: s
                     issue['classification_timestamp'] = ''
                     issue['classification_url'] = ''
 
-                f.write(json.dumps(issue, ensure_ascii=False) + '\n')
+                f.write(orjson.dumps(issue) + b'\n')
         
         return f""" Successfully merged {merged_count}/{len(collected)} issues
 Output saved to: {output_file}
@@ -288,30 +419,46 @@ def analyze_classifications(input_file: str = "issues_with_classifications.jsonl
 
 def _safe_classify_bugs(input_str):
     try:
-        parts = input_str.split(',')
+        repo, limit, error = _parse_repo_limit(input_str)
+        if error:
+            return error
         
-        if len(parts) == 1:
-            repo = parts[0].strip()
-            limit = 10
-        elif len(parts) == 2:
-            repo = parts[0].strip()
-            limit_str = parts[1].strip()
-        
-            try:
-                limit = int(limit_str)
-            except ValueError:
-                return f"Error: limit must be a number, got '{limit_str}'"
-        else:
-            return f"Error: Invalid input format. Use 'owner/repo,limit' (e.g., 'facebook/react,5')"
-        
-        if '/' not in repo:
-            return f"Error: Repository must be in 'owner/repo' format (e.g., 'prettier/prettier', not just 'prettier')"
+        return classify_bugs(repo, limit)
         
-        repo_parts = repo.split('/')
-        if len(repo_parts) != 2:
-            return f"Error: Repository must be 'owner/repo' format, got '{repo}'"
+    except Exception as e:
+        return f"Error parsing input: {str(e)}\nExpected format: 'owner/repo,limit' (e.g., 'facebook/react,5')"
+
+def classify_and_analyze(repo: str, limit: int = 10, output_file: str = "issues_with_classifications.jsonl") -> str:
+    """Run classify -> merge -> analyze in a single tool call, with no LLM turns in between"""
+    classified = _classify_repo(repo, limit)
+    
+    if classified is None:
+        return f"No issues found in {repo}"
+    
+    results, results_file, collected_file, log_file = classified
+    
+    merge_summary = merge_classifications(collected_file, results_file, output_file)
+    if merge_summary.startswith("Error"):
+        return merge_summary
+    
+    analysis_summary = analyze_classifications(output_file)
+    
+    return f"""
+Classified {len(results)} issues from {repo}
+
+Results saved to: {results_file}
+Collected data saved to: {collected_file}
+Log saved to: {log_file}
+{merge_summary}
+{analysis_summary}"""
+
+def _safe_classify_and_analyze(input_str):
+    try:
+        repo, limit, error = _parse_repo_limit(input_str)
+        if error:
+            return error
         
-        return classify_bugs(repo, limit)
+        return classify_and_analyze(repo, limit)
         
     except Exception as e:
         return f"Error parsing input: {str(e)}\nExpected format: 'owner/repo,limit' (e.g., 'facebook/react,5')"
@@ -371,6 +518,10 @@ def _safe_merge_classifications(input_str):
         if not os.path.exists(results_file):
             return f"Error: Results file not found: {results_file}"
         
+        speculative = _take_speculative_merge(collected_file, results_file, output_file)
+        if speculative is not None:
+            return speculative
+        
         return merge_classifications(collected_file, results_file, output_file)
         
     except Exception as e:
@@ -385,9 +536,9 @@ def classify_from_file(collected_file: str) -> str:
         return f"Error: File not found: {collected_file}"
     
     issues = []
-    with open(collected_file, 'r', encoding='utf-8') as f:
+    with open(collected_file, 'rb') as f:
         for line in f:
-            issues.append(json.loads(line))
+            issues.append(orjson.loads(line))
     
     if not issues:
         return f"No issues found in {collected_file}"
@@ -396,28 +547,30 @@ def classify_from_file(collected_file: str) -> str:
     
     repo = f"{issues[0]['owner']}/{issues[0]['repo']}"
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    started = datetime.now()
+    timestamp = started.strftime("%Y%m%d_%H%M%S")
     results_file = f"data/results_{timestamp}.jsonl"
     log_file = f"data/classification_{timestamp}.log"
     
     results = []
     
-    with open(log_file, 'w', encoding='utf-8') as log:
-        log.write(f"Classification started at {datetime.now().isoformat()}\n")
+    # Results are unbuffered so each one is on disk as soon as it is classified
+    with open(log_file, 'w', encoding='utf-8') as log, \
+         open(results_file, 'ab', buffering=0) as results_out:
+        log.write(f"Classification started at {started.isoformat()}\n")
         log.write(f"Source file: {collected_file}\n")
         log.write(f"Total issues to classify: {len(issues)}\n")
         log.write("="*80 + "\n\n")
         
-        for i, issue in enumerate(issues, 1):
-            print(f"Classifying issue {i}/{len(issues)}: #{issue['number']}")
+        for i, (issue, classification) in enumerate(zip(issues, _classify_in_parallel(issues)), 1):
+            print(f"Classified issue {i}/{len(issues)}: #{issue['number']}")
+            if (i - 1) % _TIMESTAMP_EVERY == 0:
+                classified_at = datetime.now().isoformat()
             
             log.write(f"[{i}/{len(issues)}] Issue #{issue['number']}: {issue['title']}\n")
-            log.flush()
-            
-            classification = classifier.classify(issue)
             
             result = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': classified_at,
                 'repo': repo, 
                 'number': issue['number'],
                 'title': issue['title'],
@@ -431,8 +584,7 @@ def classify_from_file(collected_file: str) -> str:
             
             results.append(result)
             
-            with open(results_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+            results_out.write(orjson.dumps(result) + b'\n')
 
             log.write(f"  Classification: {classification['classification']}\n")
             log.write(f"  Reasoning (first 200 chars): {classification['reasoning'][:200]}...\n")
@@ -573,6 +725,18 @@ Examples:
 
 This fetches data from GitHub AND runs classification on each issue.
 To just collect data without classification, use collect_bugs instead."""
+    ),
+    Tool(
+        name="classify_and_analyze",
+        func=lambda input_str: _safe_classify_and_analyze(input_str),
+        description="""Full workflow in one step: collect, classify, merge AND analyze bugs from a GitHub repository.
+        
+Input format: "owner/repo,limit" where limit is a number
+
+Examples:
+  - "facebook/react,5" - classify 5 bugs, merge them and run the analysis
+
+Prefer this over calling classify_bugs, merge_classifications and analyze_classifications one after another."""
     ),
     Tool(
         name="merge_classifications",
@@ -648,5 +812,5 @@ For datasets ending around 2020, use 120 months to see all data."""
 
 
 def create_tools():
-    """Return the list of tools for the agent"""
-    return tools
\ No newline at end of file
+    """Return the list of tools for the agent, sorted by name so the rendered prompt is stable"""
+    return sorted(tools, key=lambda tool: tool.name)
\ No newline at end of file
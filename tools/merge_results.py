@@ -1,13 +1,13 @@
-import json
+import orjson
 
 def merge_classifications(collected_file, results_file, output_file):
     
     print(f"Loading collected data from {collected_file}...")
     collected = {}
-    with open(collected_file, 'r', encoding='utf-8') as f:
+    with open(collected_file, 'rb') as f:
         for line in f:
             if line.strip():
-                issue = json.loads(line)
+                issue = orjson.loads(line)
                 key = (issue['owner'], issue['repo'], issue['number'])
                 collected[key] = issue
     
@@ -15,10 +15,10 @@ def merge_classifications(collected_file, results_file, output_file):
     
     print(f"Loading classifications from {results_file}...")
     classifications = {}
-    with open(results_file, 'r', encoding='utf-8') as f:
+    with open(results_file, 'rb') as f:
         for line in f:
             if line.strip():
-                result = json.loads(line)
+                result = orjson.loads(line)
                 repo_parts = result['repo'].split('/')
                 if len(repo_parts) == 2:
                     owner, repo = repo_parts
@@ -30,7 +30,7 @@ def merge_classifications(collected_file, results_file, output_file):
     print(f"Merging...")
     merged_count = 0
     
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with open(output_file, 'wb') as f:
         for key, issue in collected.items():
             if key in classifications:
 
@@ -60,7 +60,7 @@ def merge_classifications(collected_file, results_file, output_file):
                 issue['classification_timestamp'] = ''
                 issue['classification_url'] = ''
             
-            f.write(json.dumps(issue, ensure_ascii=False) + '\n')
+            f.write(orjson.dumps(issue) + b'\n')
     
     print(f" Merged {merged_count}/{len(collected)} issues")
     print(f" Saved to: {output_file}")
@@ -1,4 +1,5 @@
 import json
+import orjson
 import requests
 from pathlib import Path
 from datetime import datetime
@@ -72,13 +73,13 @@ def load_package_bugs(classified_file, package_name):
     
     bugs = []
     
-    with open(classified_file, 'r', encoding='utf-8') as f:
+    with open(classified_file, 'rb') as f:
         for line in f:
             if not line.strip():
                 continue
             
             try:
-                bug = json.loads(line)
+                bug = orjson.loads(line)
                 
                 repo = bug.get('repo', '')
                 if '/' in repo:
@@ -89,7 +90,7 @@ def load_package_bugs(classified_file, package_name):
                 if pkg.lower() == package_name.lower() and bug.get('created_at'):
                     bugs.append(bug)
                     
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 continue
     
     if not bugs:
@@ -1,4 +1,4 @@
-import json
+import orjson
 from pathlib import Path
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -51,13 +51,13 @@ def load_package_bugs(classified_file, package_name):
     
     bugs = []
     
-    with open(classified_file, 'r', encoding='utf-8') as f:
+    with open(classified_file, 'rb') as f:
         for line in f:
             if not line.strip():
                 continue
             
             try:
-                bug = json.loads(line)
+                bug = orjson.loads(line)
 
                 repo = bug.get('repo', '')
                 if '/' in repo:
@@ -72,7 +72,7 @@ def load_package_bugs(classified_file, package_name):
                     except Exception:
                         continue
                         
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 continue
     
     return bugs